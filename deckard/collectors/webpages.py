@@ -3,12 +3,17 @@ import html2text
 import json
 import os
 import requests
+import threading
 import time
 
 from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from typing import TypeVar
+from urllib.parse import urlparse
 
 from deckard.core import json_dumper
 from deckard.core.utils import open_file_read
@@ -25,12 +30,17 @@ class WebPageCollector:
     Attributes:
         CACHE_PATH (str): The path to the cache directory.
         IGNORE_PAGE_STRINGS (list): The strings to ignore in the page.
+        PREFETCH_DEPTH (int): The number of pages to keep in flight per fetch worker.
         REQUEST_HEADERS (dict): The headers to use for requests.
         URL_LIST_FILE_PATHS (str): The path to the list of URLs to collect.
         config (dict): The configuration for the collector.
+        fetch_concurrency (int): The number of pages to download at once.
         log (Logger): The logger for the collector.
         page_queue (list): The queue of pages to collect.
         page_queue_index (int): The index of the current page in the queue.
+        prefetch_queue (deque): The pending page downloads, in queue order.
+        rate_limiter (HostRateLimiter): The per-host request rate limiter.
+        session (requests.Session): The pooled HTTP session shared by all downloads.
     """
 
     CACHE_PATH = '/tmp'
@@ -44,14 +54,18 @@ class WebPageCollector:
             + 'Safari/537.3'
     }
     URL_LIST_FILE_PATHS = 'collectors/libpages/urls.txt'
+    PREFETCH_DEPTH = 2
 
     def __init__(self, config: dict, log: Logger) -> None:
         self.config = config
         self.log = log
         self.page_queue = []
         self.page_queue_index = 0
-        self.cur_url = ''
-        self.cur_content = ''
+        self.fetch_concurrency = max(1, int(config.get('fetch_concurrency', 1)))
+        self.rate_limiter = HostRateLimiter(float(config.get('fetch_rate_limit', 0)))
+        self.prefetch_queue = deque()
+        self.executor = None
+        self.session = self._build_session()
         if self.URL_LIST_FILE_PATHS:
             self._validate_data_paths()
             for url_file_path in self.URL_LIST_FILE_PATHS:
@@ -61,12 +75,58 @@ class WebPageCollector:
         return self
 
     def __next__(self) -> None:
+        if self.fetch_concurrency > 1:
+            return self._next_prefetched()
         if self.page_queue_index < len(self.page_queue):
             url = self.page_queue[self.page_queue_index].strip()
             self.page_queue_index += 1
             return self._get_page_contents(url)
         raise StopIteration
 
+    def _next_prefetched(self) -> T:
+        """Gets the next page from a pool of concurrent downloads.
+
+        Pages are downloaded ahead of the iterator, but returned in queue order.
+
+        Returns:
+            T: The page content and metadata.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.fetch_concurrency,
+                thread_name_prefix='deckard-collector'
+            )
+        while (
+            self.page_queue_index < len(self.page_queue)
+            and len(self.prefetch_queue) < self.fetch_concurrency * self.PREFETCH_DEPTH
+        ):
+            url = self.page_queue[self.page_queue_index].strip()
+            self.page_queue_index += 1
+            self.prefetch_queue.append(
+                self.executor.submit(self._get_page_contents, url)
+            )
+        if not self.prefetch_queue:
+            self.executor.shutdown()
+            self.executor = None
+            raise StopIteration
+        return self.prefetch_queue.popleft().result()
+
+    def _build_session(self) -> requests.Session:
+        """Builds the pooled HTTP session used for downloads.
+
+        Returns:
+            requests.Session: The session.
+        """
+        session = requests.Session()
+        session.headers.update(self.REQUEST_HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=self.fetch_concurrency,
+            pool_maxsize=self.fetch_concurrency
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     @staticmethod
     def name() -> str:
         """Retrieves the name of the collector.
@@ -126,43 +186,76 @@ class WebPageCollector:
         ) + '.json'
         output_file = Path(output_filename)
         metadata_file = Path(metadata_filename)
-        if (
-            not self.config['cache_urls']
-            or not output_file.is_file()
-            or not metadata_file.is_file()
-        ):
-            self.log.info("Downloading: %s", url)
-            response = requests.get(
-                url,
-                headers=self.REQUEST_HEADERS,
-                timeout=10
-            )
-            if not response.ok:
-                self.log.warning("Failed to download: %s", url)
-                return None, None
-            response.encoding = response.apparent_encoding
-            text = response.text
-            output_file.write_text(text, encoding="utf-8")
-            self.cur_url = url
-            self.cur_content = response.content
-            metadata_file.write_text(
-                self._generate_metadata(),
-                encoding="utf-8"
+        is_cached = output_file.is_file() and metadata_file.is_file()
+        if self.config['cache_urls'] and is_cached and not self.config.get('revalidate_cache', False):
+            self.log.info("Using Locally Cached Data for: %s", url)
+            return self._extract_page_text(
+                    output_file.read_text(encoding="utf-8")
+                ), json.loads(metadata_file.read_text(encoding="utf-8"))
+
+        request_headers = {}
+        if self.config['cache_urls'] and is_cached:
+            request_headers = self._get_revalidation_headers(
+                json.loads(metadata_file.read_text(encoding="utf-8"))
             )
 
-        else:
-            self.log.info("Using Locally Cached Data for: %s", url)
+        self.log.info("Downloading: %s", url)
+        self.rate_limiter.wait(url)
+        response = self.session.get(
+            url,
+            headers=request_headers,
+            timeout=10
+        )
+        if response.status_code == 304:
+            self.log.info("Not Modified, Using Locally Cached Data for: %s", url)
+            metadata = json.loads(metadata_file.read_text(encoding="utf-8"))
+            metadata['unchanged'] = True
+            return self._extract_page_text(
+                    output_file.read_text(encoding="utf-8")
+                ), metadata
+        if not response.ok:
+            self.log.warning("Failed to download: %s", url)
+            return None, {'source': url}
+        response.encoding = response.apparent_encoding
+        text = response.text
+        output_file.write_text(text, encoding="utf-8")
+        metadata_file.write_text(
+            self._generate_metadata(url, response.content, response.headers),
+            encoding="utf-8"
+        )
         return self._extract_page_text(
-                output_file.read_text(encoding="utf-8")
+                text
             ), json.loads(metadata_file.read_text(encoding="utf-8"))
 
-    def _generate_metadata(self) -> dict:
+    @staticmethod
+    def _get_revalidation_headers(metadata: dict) -> dict:
+        """Builds the conditional request headers for a cached page.
+
+        Args:
+            metadata (dict): The cached metadata for the page.
+
+        Returns:
+            dict: The conditional request headers.
+        """
+        headers = {}
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+        return headers
+
+    def _generate_metadata(self, url: str, content: bytes, headers: dict) -> dict:
         """Generates the metadata for the page.
 
+        Args:
+            url (str): The URL of the page.
+            content (bytes): The raw content of the page.
+            headers (dict): The response headers for the page.
+
         Returns:
             dict: The metadata for the page.
         """
-        soup = BeautifulSoup(self.cur_content, features="html.parser")
+        soup = BeautifulSoup(content, features="html.parser")
 
         title = soup.find("meta", property="og:title")
         if not title:
@@ -175,7 +268,9 @@ class WebPageCollector:
             "collector": self.name(),
             "source_type": "webpage",
             "timestamp": time.time(),
-            "source": self.cur_url
+            "source": url,
+            "etag": headers.get('ETag'),
+            "last_modified": headers.get('Last-Modified')
         }
         return json_dumper(metadata)
 
@@ -228,3 +323,37 @@ class WebPageCollector:
             if ignore_string in page_content:
                 return True
         return False
+
+
+class HostRateLimiter:
+    """Spaces out requests made to the same host, across threads.
+
+    Args:
+        requests_per_second (float): The maximum request rate per host. 0 disables the limit.
+
+    Attributes:
+        interval (float): The minimum number of seconds between requests to a host.
+        lock (threading.Lock): The lock guarding the request schedule.
+        next_request_times (dict): The earliest time of the next request, keyed by host.
+    """
+
+    def __init__(self, requests_per_second: float) -> None:
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.next_request_times = {}
+
+    def wait(self, url: str) -> None:
+        """Blocks until a request to the URL's host is allowed.
+
+        Args:
+            url (str): The URL about to be requested.
+        """
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_request_times.get(host, now))
+            self.next_request_times[host] = request_time + self.interval
+        if request_time > now:
+            time.sleep(request_time - now)
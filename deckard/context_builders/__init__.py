@@ -1,3 +1,3 @@
 from .simple_aggregator import SimpleContextAggregator
 from .parent_document_assembler import ParentDocumentAssembler
-
+from .reciprocal_rank_fusion_aggregator import ReciprocalRankFusionAggregator
@@ -16,38 +16,58 @@ class ParentDocumentAssembler(SimpleContextAggregator):
 
     def build_context(
             self,
-            results: Dataframe,
+            dense_results: Dataframe,
+            sparse_results: Dataframe,
             database: ContextDatabase,
             context_size: int
         ) -> T:
         """Builds the context from the context database.
 
+        The parent documents of all dense results are fetched from the
+        context database in a single lookup.
+
         Args:
-            results (Dataframe): The results to build the context from.
+            dense_results (Dataframe): The results to build the context from.
+            sparse_results (Dataframe): The sparse results. Unused, parent documents
+                           are assembled from the dense results only.
             database (ContextDatabase): The context database to build the context from.
             context_size (int): The size of the context to build.
 
         Returns:
             T: The context and the metadata.
         """
-        self.results = results
+        self.results = dense_results
         context = ""
         metadata = {'contextbuilder' : {'documents_generated': [], 'context': '', 'context_length': 0}}
-        for ind in results.index:
-            sql = f"SELECT text, chunk_id FROM {database.CONTEXT_TABLE_NAME} WHERE doc_id = '{results['doc_id'][ind]}' ORDER BY chunk_id ASC"
-            cursor = database.conn.execute(sql)
-            doc_chunks = cursor.fetchall()
+        if dense_results.empty:
+            return context, metadata
+
+        parent_chunks = database.get_chunks(list(dense_results['doc_id']))
+        used_tokens = 0
+        for ind in dense_results.index:
+            doc_chunks = parent_chunks.get(dense_results['doc_id'][ind], [])
             document = ""
+            middle_point = None
 
             # Reassemble the original document.
-            for doc_chunk in doc_chunks:
+            for chunk_id, chunk_text in doc_chunks:
                 doc_len = len(document)
-                if doc_chunk[1] == results['chunk_id'][ind]:
-                    middle_point = doc_len + len(doc_chunk[0]) / 2
-                document = document + doc_chunk[0] + "\n"
+                if chunk_id == dense_results['chunk_id'][ind]:
+                    middle_point = doc_len + len(chunk_text) / 2
+                document = document + chunk_text + "\n"
+            if middle_point is None:
+                middle_point = len(document) / 2
             metadata['contextbuilder']['documents_generated'].append(document)
 
             # Add the document to the context.
+            if self.count_tokens is not None:
+                # With a token budget, documents that do not fit are dropped whole.
+                document_tokens = self.measure(document) + 1
+                if used_tokens + document_tokens <= context_size:
+                    context = context + document + "\n"
+                    used_tokens += document_tokens
+                continue
+
             if len(document) + len(context) <= context_size:
                 context = context + document + "\n"
 
@@ -55,13 +75,13 @@ class ParentDocumentAssembler(SimpleContextAggregator):
                 # The whole document is too much to add to context. Find out how much we can add.
                 context_left = context_size - len(context)
                 # Extract this amount from the document with the middle point as the center.
-                start = middle_point - context_left / 2
-                end = middle_point + context_left / 2
+                start = max(0, middle_point - context_left / 2)
+                end = start + context_left
                 to_add = document[int(start):int(end)]
                 context = context + to_add + "\n"
                 # We've exhausted the context.
                 break
-        final_context = context[:context_size]
+        final_context = context if self.count_tokens is not None else context[:context_size]
         metadata['contextbuilder']['context'] = final_context
         metadata['contextbuilder']['context_length'] = len(final_context)
         return final_context, metadata
@@ -0,0 +1,130 @@
+from typing import TypeVar
+
+from pandas import DataFrame as Dataframe
+
+from deckard.databases.context_database import ContextDatabase
+
+from .simple_aggregator import SimpleContextAggregator
+
+T = TypeVar('T', str, dict)
+
+class ReciprocalRankFusionAggregator(SimpleContextAggregator):
+    """Fuses the dense and sparse results with reciprocal-rank fusion and aggregates the context.
+
+    Each chunk scores weight / (k + rank) for every result list it appears in.
+    Chunks returned by both retrievers are included once.
+
+    Args:
+        log (Logger): The logger for the context builder.
+        config (dict): The context builder configuration, if any. Its optional
+               elements are 'k', 'dense_weight' and 'sparse_weight'.
+
+    Attributes:
+        DEFAULT_K (int): The default rank constant.
+        dense_weight (float): The weight of the dense results.
+        k (int): The rank constant, damping the influence of top ranks.
+        sparse_weight (float): The weight of the sparse results.
+    """
+
+    DEFAULT_K = 60
+
+    def __init__(self, log, config=None):
+        super().__init__(log, config)
+        self.k = int(self.config.get('k', self.DEFAULT_K))
+        self.dense_weight = float(self.config.get('dense_weight', 1.0))
+        self.sparse_weight = float(self.config.get('sparse_weight', 1.0))
+
+    def build_context(
+            self,
+            dense_results: Dataframe,
+            sparse_results: Dataframe,
+            database: ContextDatabase,
+            context_size: int
+        ) -> T:
+        """Builds the context from the fused results.
+
+        Chunks are added whole, in fused order, while they fit in the context
+        size, measured in characters or, with a token budget, in LLM tokens.
+
+        Args:
+            dense_results (Dataframe): The dense results to build the context from.
+            sparse_results (Dataframe): The sparse results to build the context from.
+            database (ContextDatabase): The context database. Unused.
+            context_size (int): The size of the context to build.
+
+        Returns:
+            T: The context and the metadata.
+        """
+        fused = {}
+        self._add_ranked(fused, dense_results, 'doc_id', 'text', self.dense_weight, 'dense')
+        self._add_ranked(fused, sparse_results, 'document_id', 'document', self.sparse_weight, 'sparse')
+        ranked = sorted(fused.values(), key=lambda chunk: chunk['rrf_score'], reverse=True)
+        self.results = ranked
+
+        duplicates_removed = len(dense_results) + len(sparse_results) - len(ranked)
+        metadata = {'contextbuilder' : {'chunks_used': [], 'duplicates_removed': duplicates_removed, 'context': '', 'context_length': 0}}
+        context = ""
+        used_size = 0
+        for chunk in ranked:
+            # One more character, or token, for the separating newline.
+            chunk_size = self.measure(chunk['text'], chunk['token_count']) + 1
+            if used_size + chunk_size > context_size:
+                continue
+            context += chunk['text'] + "\n"
+            used_size += chunk_size
+            metadata['contextbuilder']['chunks_used'].append(
+                {
+                    'chunk': chunk['text'],
+                    'metadata': chunk['metadata'],
+                    'rrf_score': round(chunk['rrf_score'], 6),
+                    'sources': chunk['sources']
+                }
+            )
+
+        metadata['contextbuilder']['context'] = context
+        metadata['contextbuilder']['context_length'] = len(context)
+        if self.count_tokens is not None:
+            metadata['contextbuilder']['context_tokens'] = used_size
+        return context, metadata
+
+    def _add_ranked(
+            self,
+            fused: dict,
+            results: Dataframe,
+            doc_id_column: str,
+            text_column: str,
+            weight: float,
+            source: str
+        ) -> None:
+        """Adds the reciprocal-rank scores of a result list to the fused chunks.
+
+        Args:
+            fused (dict): The fused chunks, keyed by (document ID, chunk ID).
+            results (Dataframe): The ranked results.
+            doc_id_column (str): The column holding the document ID.
+            text_column (str): The column holding the chunk text.
+            weight (float): The weight of the result list.
+            source (str): The name of the result list.
+        """
+        if results.empty:
+            return
+        for rank, (_, row) in enumerate(results.iterrows(), start=1):
+            key = (str(self._first(row[doc_id_column])), int(self._first(row['chunk_id'])))
+            if key not in fused:
+                fused[key] = {
+                    'text': self._first(row[text_column]),
+                    'metadata': row['metadata'],
+                    'token_count': row.get('token_count'),
+                    'rrf_score': 0.0,
+                    'sources': []
+                }
+            if source not in fused[key]['sources']:
+                fused[key]['rrf_score'] += weight / (self.k + rank)
+                fused[key]['sources'].append(source)
+
+    @staticmethod
+    def _first(value):
+        """Unwraps a multi-valued search field."""
+        if isinstance(value, list):
+            return value[0]
+        return value
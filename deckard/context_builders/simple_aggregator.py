@@ -8,11 +8,41 @@ class SimpleContextAggregator:
 
     Args:
         log (Logger): The logger for the context builder.
+        config (dict): The context builder configuration, if any.
     """
 
-    def __init__(self, log):
+    def __init__(self, log, config=None):
         self.results = []
         self.log = log
+        self.config = config or {}
+        self.count_tokens = None
+
+    def use_token_budget(self, count_tokens):
+        """Measures the context size in LLM tokens instead of characters.
+
+        In token mode, chunks that do not fit in the remaining budget are
+        dropped whole instead of the context being truncated.
+
+        Args:
+            count_tokens (callable): Counts the tokens of a text. None measures characters.
+        """
+        self.count_tokens = count_tokens
+
+    def measure(self, text, token_count=None):
+        """Measures a text in the context size unit.
+
+        Args:
+            text (str): The text.
+            token_count (int): The text's precomputed token count, if known.
+
+        Returns:
+            int: The number of tokens, or characters if not in token mode.
+        """
+        if self.count_tokens is None:
+            return len(text)
+        if token_count is not None and not pd.isna(token_count):
+            return int(token_count)
+        return self.count_tokens(text)
 
     def build_context(self, dense_results, sparse_results, database, context_size):
         """Builds the context from the results.
@@ -38,6 +68,9 @@ class SimpleContextAggregator:
         combined_results = pd.concat([dense_results, sparse_results], keys=['dense_results', 'sparse_results']).sort_index(level=1)
 
         metadata = {'contextbuilder' : {'chunks_used': [], 'context': '', 'context_length': 0}}
+        if self.count_tokens is not None:
+            return self._build_token_budgeted_context(combined_results, context_size, metadata)
+
         context = ""
         for chunk in combined_results.iterrows():
             row_text = chunk[1]['value']
@@ -57,3 +90,36 @@ class SimpleContextAggregator:
         metadata['contextbuilder']['context_length'] = len(final_context)
 
         return final_context, metadata
+
+    def _build_token_budgeted_context(self, combined_results, token_budget, metadata):
+        """Builds the context from whole chunks that fit in the token budget.
+
+        Args:
+            combined_results (Dataframe): The interleaved results.
+            token_budget (int): The number of tokens available for the context.
+            metadata (dict): The context builder metadata to fill.
+
+        Returns:
+            T: The context and the metadata.
+        """
+        context = ""
+        used_tokens = 0
+        for _, row in combined_results.iterrows():
+            row_text = row['value']
+            # One more token for the separating newline.
+            row_tokens = self.measure(row_text, row.get('token_count')) + 1
+            if used_tokens + row_tokens > token_budget:
+                continue
+            context += row_text + "\n"
+            used_tokens += row_tokens
+            metadata['contextbuilder']['chunks_used'].append(
+                {
+                    'chunk': row_text,
+                    'metadata': row['metadata']
+                }
+            )
+
+        metadata['contextbuilder']['context'] = context
+        metadata['contextbuilder']['context_length'] = len(context)
+        metadata['contextbuilder']['context_tokens'] = used_tokens
+        return context, metadata
@@ -1,11 +1,22 @@
+import json
 from logging import Logger
 from langchain_community.llms import LlamaCpp
 from langchain.prompts import PromptTemplate
 from langchain_core.runnables import RunnableSequence
+from llama_cpp import LlamaGrammar
 
-from deckard.llm import get_context_only_prompt, get_context_plus_prompt, response_addresses_query_prompt, malicious_classification_prompt, explode_query_prompt, summarize_response_prompt, get_sources_prompt, qa_response_prompt
+from deckard.llm import CompoundClassifier, MaliciousClassifier, PreflightClassifier, PrefixCache, QAResponder, ResponseSourceExtractor, ResponseVerifier, get_context_only_prompt, get_context_plus_prompt, response_addresses_query_prompt, malicious_classification_prompt, explode_query_prompt, preflight_classification_prompt, summarize_response_prompt, get_sources_prompt, qa_response_prompt
 
-from .config import get_rag_pipelines
+from .config import get_api_llm_config, get_rag_pipelines
+
+JSON_CHAIN_SCHEMAS = {
+    'chain-verify-response': ResponseVerifier.JSON_SCHEMA,
+    'compound': CompoundClassifier.JSON_SCHEMA,
+    'malicious': MaliciousClassifier.JSON_SCHEMA,
+    'preflight': PreflightClassifier.JSON_SCHEMA,
+    'sources': ResponseSourceExtractor.JSON_SCHEMA,
+    'qa': QAResponder.JSON_SCHEMA
+}
 
 def build_rag_stacks(log: Logger) -> dict:
     """Builds the RAG stacks from the configuration.
@@ -27,56 +38,102 @@ def build_rag_stacks(log: Logger) -> dict:
         stacks[w['name']] = rs(w['rag'], log)
     return stacks
 
-def build_llm_chains(llm: LlamaCpp) -> list[RunnableSequence]:
+def build_llm_chains(llm: LlamaCpp, prefix_cache: PrefixCache=None) -> list[RunnableSequence]:
     """Builds the LLM chains from the LLM.
 
+    If 'json_grammar' is enabled in the LLM configuration, the chains in
+    JSON_CHAIN_SCHEMAS are constrained to emit JSON matching their schema.
+
     Args:
         llm (LlamaCpp): The LLM to build the chains from.
+        prefix_cache (PrefixCache): The cache restoring each chain's prompt prefix, if any.
 
     Returns:
         list[RunnableSequence]: The LLM chains.
     """
+    json_grammar = get_api_llm_config().get('json_grammar', False)
     chains = {}
     chains['chain-context-only'] = build_llm_chain(
         llm,
-        get_context_only_prompt()
+        get_context_only_prompt(),
+        prefix_cache,
+        'chain-context-only',
+        JSON_CHAIN_SCHEMAS.get('chain-context-only') if json_grammar else None
     )
     chains['chain-context-plus'] = build_llm_chain(
         llm,
-        get_context_plus_prompt()
+        get_context_plus_prompt(),
+        prefix_cache,
+        'chain-context-plus',
+        JSON_CHAIN_SCHEMAS.get('chain-context-plus') if json_grammar else None
     )
     chains['chain-verify-response'] = build_llm_chain(
         llm,
-        response_addresses_query_prompt()
+        response_addresses_query_prompt(),
+        prefix_cache,
+        'chain-verify-response',
+        JSON_CHAIN_SCHEMAS.get('chain-verify-response') if json_grammar else None
     )
     chains['compound'] = build_llm_chain(
         llm,
-        explode_query_prompt()
+        explode_query_prompt(),
+        prefix_cache,
+        'compound',
+        JSON_CHAIN_SCHEMAS.get('compound') if json_grammar else None
     )
     chains['malicious'] = build_llm_chain(
         llm,
-        malicious_classification_prompt()
+        malicious_classification_prompt(),
+        prefix_cache,
+        'malicious',
+        JSON_CHAIN_SCHEMAS.get('malicious') if json_grammar else None
+    )
+    chains['preflight'] = build_llm_chain(
+        llm,
+        preflight_classification_prompt(),
+        prefix_cache,
+        'preflight',
+        JSON_CHAIN_SCHEMAS.get('preflight') if json_grammar else None
     )
     chains['summarizer'] = build_llm_chain(
         llm,
-        summarize_response_prompt()
+        summarize_response_prompt(),
+        prefix_cache,
+        'summarizer',
+        JSON_CHAIN_SCHEMAS.get('summarizer') if json_grammar else None
     )
     chains['sources'] = build_llm_chain(
         llm,
-        get_sources_prompt()
+        get_sources_prompt(),
+        prefix_cache,
+        'sources',
+        JSON_CHAIN_SCHEMAS.get('sources') if json_grammar else None
     )
     chains['qa'] = build_llm_chain(
         llm,
-        qa_response_prompt()
+        qa_response_prompt(),
+        prefix_cache,
+        'qa',
+        JSON_CHAIN_SCHEMAS.get('qa') if json_grammar else None
     )
     return chains
 
-def build_llm_chain(llm: LlamaCpp, template: str) -> RunnableSequence:
+def build_llm_chain(
+        llm: LlamaCpp,
+        template: str,
+        prefix_cache: PrefixCache=None,
+        name: str=None,
+        json_schema: dict=None
+    ) -> RunnableSequence:
     """Builds an LLM chain from the LLM and template.
 
     Args:
         llm (LlamaCpp): The LLM to build the chain from.
         template (str): The query template for the chain.
+        prefix_cache (PrefixCache): The cache restoring the chain's prompt prefix, if any.
+        name (str): The chain name, keying its cached prefix.
+        json_schema (dict): The JSON schema to constrain the chain's output to, if any.
+                    Generation stops once the JSON object is complete.
 
     Returns:
         RunnableSequence: The LLM chain sequence.
@@ -85,4 +142,8 @@ def build_llm_chain(llm: LlamaCpp, template: str) -> RunnableSequence:
         input_variables=["context", "query"],
         template=template,
     )
+    if json_schema is not None:
+        llm = llm.bind(grammar=LlamaGrammar.from_json_schema(json.dumps(json_schema), verbose=False))
+    if prefix_cache is not None:
+        return prefix_cache.wrap(name, prompt, llm)
     return prompt | llm
@@ -26,6 +26,31 @@ def get_api_llm_config() -> dict:
     """
     return get_api_config()['llm']['model']
 
+def get_api_preflight_classifier() -> str:
+    """Gets the pre-flight classifier mode from the configuration file.
+
+    Returns:
+        str: 'combined' to classify malicious intent and split compound queries
+             in one LLM call, 'separate' to use one call for each.
+    """
+    return get_api_config().get('preflight_classifier') or 'separate'
+
+def get_api_response_cache_config() -> dict:
+    """Gets the response cache configuration from the configuration file.
+
+    Returns:
+        dict: The response cache configuration. Empty if it is not configured.
+    """
+    return get_api_config().get('response_cache') or {}
+
+def get_api_jobs_config() -> dict:
+    """Gets the asynchronous job queue configuration from the configuration file.
+
+    Returns:
+        dict: The job queue configuration. Empty if it is not configured.
+    """
+    return get_api_config().get('jobs') or {}
+
 def get_http_user_agent() -> str:
     """Gets the HTTP user agent from the configuration file.
 
@@ -109,6 +134,14 @@ def get_data_dir() -> str:
     """
     return get_config_as_dict()['data_dir']
 
+def get_embedding_cache_config() -> dict:
+    """Gets the embedding cache configuration from the configuration file.
+
+    Returns:
+        dict: The embedding cache configuration. Empty if not configured.
+    """
+    return get_config_as_dict().get('embedding_cache') or {}
+
 def get_api_port() -> int:
     """Gets the API port from the configuration file.
 
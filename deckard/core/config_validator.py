@@ -15,10 +15,38 @@ class DatabaseConfig(BaseModel):
     class_name: str
     name: str
 
+class VectorIndexConfig(BaseModel):
+    enabled: Optional[bool]
+    type: Optional[str] = Field(None, regex=r"^(IVF_PQ|HNSW|IVF_HNSW_SQ|IVF_HNSW_PQ)$")
+    metric: Optional[str] = Field(None, regex=r"^(L2|cosine|dot)$")
+    num_partitions: Optional[int] = Field(None, ge=1)
+    num_sub_vectors: Optional[int] = Field(None, ge=1)
+    m: Optional[int] = Field(None, ge=1)
+    ef_construction: Optional[int] = Field(None, ge=1)
+    min_rows: Optional[int] = Field(None, ge=0)
+    scalar_columns: Optional[List[str]]
+
+class VectorQueryConfig(BaseModel):
+    nprobes: Optional[int] = Field(None, ge=1)
+    refine_factor: Optional[int] = Field(None, ge=1)
+
+class EmbeddingDatabaseConfig(DatabaseConfig):
+    timeout: Optional[float] = Field(None, gt=0)
+    write_buffer_rows: Optional[int] = Field(None, ge=1)
+    index: Optional[VectorIndexConfig]
+    query: Optional[VectorQueryConfig]
+
+class ContextDatabaseConfig(DatabaseConfig):
+    preload: Optional[bool]
+
 class EncoderConfig(BaseModel):
     module_name: str
     class_name: str
     model: str
+    batch_size: Optional[int] = Field(None, ge=1)
+    device: Optional[str] = Field(None, regex=r"^(cpu|cuda|cuda:\d+|auto)$")
+    threads: Optional[int] = Field(None, ge=1)
+    quantize: Optional[bool]
 
 class QAStackConfig(BaseModel):
     module_name: str
@@ -44,11 +72,17 @@ class ChunkerConfig(BaseModel):
 class ContextBuilderConfig(BaseModel):
     module_name: str
     class_name: str
+    k: Optional[int] = Field(None, ge=1)
+    dense_weight: Optional[float] = Field(None, ge=0)
+    sparse_weight: Optional[float] = Field(None, ge=0)
 
 class SparseSearchConfig(BaseModel):
     module_name: str
     class_name: str
     uri: HttpUrl
+    batch_size: Optional[int] = Field(None, ge=1)
+    commit_within: Optional[int] = Field(None, ge=0)
+    timeout: Optional[float] = Field(None, gt=0)
 
 class QueryProcessorConfig(BaseModel):
     module_name: str
@@ -59,26 +93,47 @@ class RerankerConfig(BaseModel):
     class_name: str
     model: str
     max_raw_results: int = Field(..., ge=1)
+    batch_size: Optional[int] = Field(None, ge=1)
+    max_length: Optional[int] = Field(None, ge=1)
+    score_threshold: Optional[float]
+    use_stored_vectors: Optional[bool]
+    device: Optional[str] = Field(None, regex=r"^(cpu|cuda|cuda:\d+|auto)$")
+    threads: Optional[int] = Field(None, ge=1)
 
 class ResponseProcessorConfig(BaseModel):
     module_name: str
     class_name: str
 
+class ContextConfig(BaseModel):
+    size: int = Field(..., ge=1)
+    max_vector_distance: float = Field(..., ge=0)
+    token_budget: Optional[bool]
+    max_tokens: Optional[int] = Field(None, ge=1)
+
+class BuildConfig(BaseModel):
+    buffer_rows: Optional[int] = Field(None, ge=1)
+    buffer_bytes: Optional[int] = Field(None, ge=1)
+
 class RagConfig(BaseModel):
     name: str
     stack: QAStackConfig
     collectors: Optional[List[CollectorConfig]]
-    context: Optional[dict]
+    build: Optional[BuildConfig]
+    context: Optional[ContextConfig]
     chunker: Optional[ChunkerConfig]
     context_builder: Optional[ContextBuilderConfig]
-    context_database: Optional[DatabaseConfig]
-    embedding_database: Optional[DatabaseConfig]
+    context_database: Optional[ContextDatabaseConfig]
+    embedding_database: Optional[EmbeddingDatabaseConfig]
     sparse_search: Optional[SparseSearchConfig]
     embedding_encoder: Optional[EncoderConfig]
     query_processor: Optional[QueryProcessorConfig]
     reranker: Optional[RerankerConfig]
     response_processor: Optional[ResponseProcessorConfig]
 
+class PrefixCacheConfig(BaseModel):
+    enabled: bool
+    persist: Optional[bool]
+
 class LLMModelConfig(BaseModel):
     type: str
     repo: str
@@ -93,6 +148,20 @@ class LLMModelConfig(BaseModel):
     top_p: float = Field(..., ge=0, le=1)
     min_p: float = Field(..., ge=0, le=1)
     verbose: bool
+    device: Optional[str] = Field(None, regex=r"^(cpu|cuda|cuda:\d+|auto)$")
+    n_threads: Optional[int] = Field(None, ge=1)
+    prefix_cache: Optional[PrefixCacheConfig]
+    json_grammar: Optional[bool]
+
+class JobsConfig(BaseModel):
+    max_queued: Optional[int] = Field(None, ge=1)
+    retention_seconds: Optional[int] = Field(None, ge=1)
+
+class ResponseCacheConfig(BaseModel):
+    enabled: bool
+    max_entries: Optional[int] = Field(None, ge=1)
+    ttl_seconds: Optional[int] = Field(None, ge=1)
+    persist: Optional[bool]
 
 class APIConfig(BaseModel):
     host: str = Field(..., regex=r"^\d{1,3}(\.\d{1,3}){3}$")  # Matches IPv4 addresses
@@ -100,6 +169,9 @@ class APIConfig(BaseModel):
     llm: LLMModelConfig
     gpu_lock_file: str
     gpu_exclusive_mode: bool
+    preflight_classifier: Optional[str] = Field(None, regex=r"^(combined|separate)$")
+    jobs: Optional[JobsConfig]
+    response_cache: Optional[ResponseCacheConfig]
 
 class ClientConfig(BaseModel):
     timeout: int = Field(..., ge=1)
@@ -114,9 +186,14 @@ class SlackBotConfig(BaseModel):
     slack_app_token: str
     slack_bot_token: str
 
+class EmbeddingCacheConfig(BaseModel):
+    enabled: bool
+    max_entries: Optional[int] = Field(None, ge=0)
+
 class Config(BaseModel):
     api: APIConfig
     data_dir: str
+    embedding_cache: Optional[EmbeddingCacheConfig]
     rag: RagConfig
     client: ClientConfig
     slackbot: SlackBotConfig
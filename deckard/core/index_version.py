@@ -0,0 +1,84 @@
+"""Tracks the version of each pipeline's indexed data."""
+import hashlib
+import json
+import os
+from logging import Logger
+
+from .config import get_data_dir
+from .jsoncore import json_dumper
+from .time import cur_timestamp
+from .utils import gen_uuid, open_file_read, open_file_write
+
+def get_index_versions_path() -> str:
+    """Gets the path to the index version files.
+
+    Returns:
+        str: The path.
+    """
+    return os.path.join(get_data_dir(), 'index_versions')
+
+def _get_index_version_filepath(name: str) -> str:
+    """Gets the path to the index version file of a pipeline.
+
+    Args:
+        name (str): The name of the pipeline.
+
+    Returns:
+        str: The path.
+    """
+    return os.path.join(get_index_versions_path(), f'{name}.json')
+
+def _read_index_versions(name: str) -> dict:
+    """Reads the index versions of a pipeline.
+
+    Args:
+        name (str): The name of the pipeline.
+
+    Returns:
+        dict: The version of each index, keyed by index type. Empty if none were written.
+    """
+    filepath = _get_index_version_filepath(name)
+    if not os.path.isfile(filepath):
+        return {}
+    with open_file_read(filepath) as f:
+        return json.load(f)
+
+def get_index_version(name: str, index_type: str=None) -> str:
+    """Gets the fingerprint of a pipeline's current index versions.
+
+    Args:
+        name (str): The name of the pipeline.
+        index_type (str): The type of index, such as 'rag' or 'qa'. All of the pipeline's indexes if None.
+
+    Returns:
+        str: The fingerprint. It changes whenever any of the pipeline's indexes is rebuilt,
+             or only the given type of index if one is given.
+    """
+    versions = _read_index_versions(name)
+    if index_type is not None:
+        versions = versions.get(index_type, {})
+    return hashlib.md5(json_dumper(versions, sort_keys=True).encode('utf-8')).hexdigest()
+
+def bump_index_version(name: str, index_type: str, log: Logger) -> str:
+    """Records that one of a pipeline's indexes was rebuilt.
+
+    Args:
+        name (str): The name of the pipeline.
+        index_type (str): The type of index rebuilt, such as 'rag' or 'qa'.
+        log (Logger): The logger.
+
+    Returns:
+        str: The new version of the index.
+    """
+    versions = _read_index_versions(name)
+    versions[index_type] = {
+        'version': gen_uuid(),
+        'built': cur_timestamp()
+    }
+    path = get_index_versions_path()
+    if not os.path.exists(path):
+        os.makedirs(path)
+    with open_file_write(_get_index_version_filepath(name)) as f:
+        f.write(json_dumper(versions))
+    log.info("Bumped %s index version of pipeline %s.", index_type, name)
+    return versions[index_type]['version']
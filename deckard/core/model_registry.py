@@ -0,0 +1,166 @@
+"""Provides a process-wide registry of loaded models."""
+import hashlib
+import threading
+from logging import Logger
+
+from .classloader import load_class
+from .jsoncore import json_dumper
+from .utils import clear_gpu_memory, resolve_device
+
+class ModelRegistry:
+    """Shares model instances between the stacks of a process, with reference counts.
+
+    Models are keyed by module, class, model name, device and a hash of the
+    configuration fields that change how the model is built, so stacks that
+    differ only in per-call settings share one instance. The first
+    acquirer's configuration is used to construct it.
+
+    Attributes:
+        MODEL_CONFIG_FIELDS (tuple): The configuration fields that change how a model is built, hashed into its key.
+        lock (threading.Lock): The lock guarding the registry.
+        models (dict): The loaded models, keyed by model key. Each value has
+               the following elements:
+                 - instance: The model instance.
+                 - refs: The number of holders of the instance.
+    """
+
+    MODEL_CONFIG_FIELDS = ('quantize', 'max_length', 'threads')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.models = {}
+
+    @staticmethod
+    def model_key(module_name: str, class_name: str, model: str, config: dict=None) -> tuple:
+        """Builds the registry key of a model.
+
+        Args:
+            module_name (str): The module of the model's class.
+            class_name (str): The model's class.
+            model (str): The name of the model.
+            config (dict): The model's configuration, if any.
+
+        Returns:
+            tuple: The key.
+        """
+        config = config or {}
+        device = resolve_device(config.get('device', 'cuda'))
+        model_config = {
+            field: config[field] for field in ModelRegistry.MODEL_CONFIG_FIELDS
+            if config.get(field) is not None
+        }
+        config_hash = hashlib.md5(json_dumper(model_config, sort_keys=True).encode('utf-8')).hexdigest()
+        return (module_name, class_name, model, device, config_hash)
+
+    def acquire(
+            self,
+            module_name: str,
+            class_name: str,
+            model: str,
+            log: Logger,
+            config: dict=None
+        ) -> object:
+        """Gets a shared model instance, loading it if no other holder has.
+
+        Args:
+            module_name (str): The module of the model's class.
+            class_name (str): The model's class.
+            model (str): The name of the model.
+            log (Logger): The logger for the model.
+            config (dict): The model's configuration, passed to the constructor if given.
+
+        Returns:
+            object: The model instance.
+        """
+        key = self.model_key(module_name, class_name, model, config)
+        with self.lock:
+            entry = self.models.get(key)
+            if entry is None:
+                args = [model, log]
+                if config is not None:
+                    args.append(config)
+                entry = {'instance': load_class(module_name, class_name, args), 'refs': 0}
+                self.models[key] = entry
+            else:
+                log.info("Reusing loaded model: %s (%s)", model, class_name)
+            entry['refs'] += 1
+            return entry['instance']
+
+    def release(self, instance: object) -> bool:
+        """Releases a holder's reference to a model instance, unloading it once unreferenced.
+
+        The model's memory is freed once its holders drop their own references
+        to the instance, and clear_gpu_memory() is called.
+
+        Args:
+            instance (object): The model instance.
+
+        Returns:
+            bool: True if the model was unloaded, False otherwise.
+        """
+        with self.lock:
+            for key, entry in self.models.items():
+                if entry['instance'] is instance:
+                    entry['refs'] -= 1
+                    if entry['refs'] <= 0:
+                        del self.models[key]
+                        return True
+                    return False
+        return False
+
+    def count(self) -> int:
+        """Counts the loaded models.
+
+        Returns:
+            int: The number of loaded models.
+        """
+        with self.lock:
+            return len(self.models)
+
+
+model_registry = ModelRegistry()
+
+def acquire_model(
+        module_name: str,
+        class_name: str,
+        model: str,
+        log: Logger,
+        config: dict=None
+    ) -> object:
+    """Gets a shared model instance from the process-wide registry.
+
+    Args:
+        module_name (str): The module of the model's class.
+        class_name (str): The model's class.
+        model (str): The name of the model.
+        log (Logger): The logger for the model.
+        config (dict): The model's configuration, passed to the constructor if given.
+
+    Returns:
+        object: The model instance.
+    """
+    return model_registry.acquire(module_name, class_name, model, log, config)
+
+def release_model(instance: object) -> bool:
+    """Releases a model instance acquired from the process-wide registry.
+
+    Args:
+        instance (object): The model instance.
+
+    Returns:
+        bool: True if the model was unloaded, False otherwise.
+    """
+    return model_registry.release(instance)
+
+def close_stacks(stacks: dict) -> None:
+    """Closes stacks, releasing their models, and frees the unloaded models' memory.
+
+    Args:
+        stacks (dict): The stacks to close, keyed by name. May be None.
+    """
+    if not stacks:
+        return
+    for stack in stacks.values():
+        stack.close()
+    stacks.clear()
+    clear_gpu_memory()
@@ -78,6 +78,26 @@ class TimingManager:
             self.timings[timing_id] += elapsed_time
             del self.start_times[timing_id]
 
+    def record(self, timing_id: str, value: float):
+        """
+        Records a measured value under the given ID, replacing any previous value.
+
+        Args:
+            timing_id (str): The timing ID to record.
+            value (float): The value.
+        """
+        self.timings[timing_id] = value
+
+    def add(self, timing_id: str, value: float):
+        """
+        Adds a measured value to the given ID, so repeated measurements accumulate like finalized timings.
+
+        Args:
+            timing_id (str): The timing ID to add to.
+            value (float): The value.
+        """
+        self.timings[timing_id] = self.timings.get(timing_id, 0) + value
+
     def get_timings(self):
         """
         Returns all stored timings as a dictionary.
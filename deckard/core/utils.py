@@ -14,6 +14,46 @@ def clear_gpu_memory() -> None:
     torch.cuda.empty_cache()
     gc.collect()
 
+def resolve_device(device: str='cuda', log: Logger=None) -> str:
+    """Resolves a configured device to one available on this host.
+
+    Args:
+        device (str): The configured device: 'cpu', 'cuda', 'cuda:N' or 'auto'.
+        log (Logger): The logger to warn on fallback, if any.
+
+    Returns:
+        str: The device to use. 'cpu' if CUDA, or the requested CUDA device, is unavailable.
+    """
+    device = str(device or 'cuda').lower()
+    if device == 'cpu':
+        return device
+    if device == 'auto':
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    if not device.startswith('cuda'):
+        raise ValueError(f"Unknown device: {device}")
+    if not torch.cuda.is_available():
+        if log:
+            log.warning("CUDA is not available, using CPU instead of %s.", device)
+        return 'cpu'
+    if ':' in device and int(device.split(':')[1]) >= torch.cuda.device_count():
+        if log:
+            log.warning("CUDA device %s does not exist, using CPU instead.", device)
+        return 'cpu'
+    return device
+
+def set_cpu_threads(threads: int, log: Logger=None) -> None:
+    """Sets the number of threads torch uses for CPU inference.
+
+    Args:
+        threads (int): The number of threads. Ignored if not set.
+        log (Logger): The logger, if any.
+    """
+    if not threads:
+        return
+    torch.set_num_threads(int(threads))
+    if log:
+        log.info("Using %s CPU threads for inference.", threads)
+
 def gen_uuid() -> str:
     """Generates a UUID.
 
@@ -12,3 +12,20 @@ class ContextDatabase:
     def add_contexts(self, document, create_table=False):
         """Adds contexts to the context database."""
 
+    def add_contexts_batch(self, documents, create_table=False):
+        """Adds the contexts of many documents to the context database at once."""
+
+    def delete_documents(self, doc_ids):
+        """Deletes the contexts of the given documents from the context database."""
+
+    def commit(self):
+        """Commits the pending writes to the context database."""
+
+    def sample_chunks(self, limit):
+        """Gets the text of randomly chosen chunks."""
+
+    def get_chunks(self, doc_ids):
+        """Gets the (chunk_id, text) chunks of many documents, keyed by document ID."""
+
+    def optimize(self):
+        """Compacts the context database and refreshes its statistics."""
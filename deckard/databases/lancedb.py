@@ -1,10 +1,14 @@
 """Provides a LanceDB interface for adding and querying embeddings."""
+import math
 import os
 import sys
+import time
+from datetime import timedelta
 from logging import Logger
 from typing import TypeVar
 
 import lancedb
+import numpy as np
 import pyarrow as pa
 import pandas as pd
 from lance.vector import vec_to_table
@@ -19,32 +23,69 @@ class LanceDB:
     Args:
         name (str): The name of the database.
         log (Logger): The logger for the database.
+        create_if_not_exists (bool): Whether to create the database if it does not exist.
+        config (dict): The embedding database configuration, if any. Its
+               optional 'index' and 'query' sections configure the
+               vector index and query-time search parameters, and
+               'write_buffer_rows' the number of rows buffered per write.
 
     Attributes:
+        DEFAULT_CLEANUP_OLDER_THAN_HOURS (int): The default age of old table versions removed by optimize().
+        DEFAULT_INDEX_MIN_ROWS (int): The default minimum row count for building a vector index.
+        DEFAULT_PQ_REFINE_FACTOR (int): The default refine factor for searches of an IVF_PQ index.
+        DEFAULT_SCALAR_INDEX_COLUMNS (list): The columns that get a scalar index by default.
+        DEFAULT_WRITE_BUFFER_ROWS (int): The default number of rows buffered before writing.
+        DELETE_BATCH_SIZE (int): The number of documents to delete per delete statement.
         EMBEDDINGS_TABLE_NAME (str): The name of the table for the embeddings.
         DATA_PATH (str): The path to the data directory.
+        VECTOR_INDEX_TYPES (dict): The supported vector index types, keyed by configured name.
         name (str): The name of the database.
         log (Logger): The logger for the database.
-        create_if_not_exists (bool): Whether to create the database if it does not exist.
         connection (lancedb.Connection): The connection to the database.
-        embeddings_table (lancedb.Table): The table for the embeddings.
+        db_filepath (str): The path to the database files.
+        embeddings_table (lancedb.Table): The table for the embeddings. None if it does not exist.
+        index_config (dict): The vector and scalar index configuration.
+        pending_rows (int): The number of rows waiting in the write buffer.
+        pending_writes (list): The Arrow tables waiting in the write buffer.
+        query_config (dict): The query-time search parameters.
+        write_buffer_rows (int): The number of rows buffered before writing.
     """
 
+    DEFAULT_CLEANUP_OLDER_THAN_HOURS = 1
+    DEFAULT_INDEX_MIN_ROWS = 5000
+    DEFAULT_PQ_REFINE_FACTOR = 10
+    DEFAULT_SCALAR_INDEX_COLUMNS = ['doc_id', 'chunk_id']
+    DEFAULT_WRITE_BUFFER_ROWS = 8192
+    DELETE_BATCH_SIZE = 1000
     EMBEDDINGS_TABLE_NAME = "llm_embeddings"
     DATA_PATH = os.path.join(
         get_data_dir(),
         'databases',
         'lancedb'
     )
+    VECTOR_INDEX_TYPES = {
+        'IVF_PQ': 'IVF_PQ',
+        'HNSW': 'IVF_HNSW_SQ',
+        'IVF_HNSW_SQ': 'IVF_HNSW_SQ',
+        'IVF_HNSW_PQ': 'IVF_HNSW_PQ'
+    }
 
     def __init__(
             self,
             name: str,
             log: Logger,
-            create_if_not_exists: bool=False
+            create_if_not_exists: bool=False,
+            config: dict=None
         ) -> None:
         self.log = log
+        config = config or {}
+        self.index_config = config.get('index') or {}
+        self.query_config = config.get('query') or {}
+        self.write_buffer_rows = int(config.get('write_buffer_rows', self.DEFAULT_WRITE_BUFFER_ROWS))
+        self.pending_writes = []
+        self.pending_rows = 0
         db_filepath = os.path.join(self.DATA_PATH, '.' + name)
+        self.db_filepath = db_filepath
         if not os.path.exists(self.DATA_PATH):
             if create_if_not_exists:
                 self.log.info("Creating Database Path: %s", name)
@@ -54,6 +95,7 @@ class LanceDB:
                 sys.exit(1)
         self.log.info(f"Connecting to Database: {name}")
         self.connection = lancedb.connect(db_filepath)
+        self.embeddings_table = None
         try:
             self.embeddings_table = self.connection.open_table(self.EMBEDDINGS_TABLE_NAME)
         except Exception:
@@ -61,10 +103,13 @@ class LanceDB:
 
     def flush_data(self):
         """Flushes all data from the embeddings table."""
+        self.pending_writes = []
+        self.pending_rows = 0
         self.connection.drop_table(
             self.EMBEDDINGS_TABLE_NAME,
             ignore_missing=True
         )
+        self.embeddings_table = None
 
     def _create_table(self, data: dict):
         """Creates the embeddings table in the database
@@ -82,7 +127,7 @@ class LanceDB:
     ##
     def add_embeddings(
             self,
-            document: list,
+            document: dict,
             embedding_id_start: int,
             create_table: bool=False
         ) -> int:
@@ -100,22 +145,113 @@ class LanceDB:
         Returns:
             int: The highest embedding id inserted
         """
-        item_metadata, embeddings, embedding_id = self._build_database_values_for_document(
-            document,
-            embedding_id_start
+        return self.add_embeddings_batch(
+            [document],
+            embedding_id_start,
+            create_table
         )
 
+    def add_embeddings_batch(
+            self,
+            documents: list,
+            embedding_id_start: int,
+            create_table: bool=False
+        ) -> int:
+        """Adds the embeddings of many documents to lancedb as a single write.
+
+        Args:
+            documents (list): The documents to add to the database. See
+                      add_embeddings for the elements of each document.
+            embedding_id_start (int): The starting embedding id.
+            create_table (bool): Whether to create the table if it does not exist.
+
+        Returns:
+            int: The highest embedding id inserted
+        """
+        item_metadata = {
+            'id': [],
+            'text': [],
+            'doc_id': [],
+            'chunk_id': [],
+            'metadata': []
+        }
+        if documents and 'token_counts' in documents[0]:
+            item_metadata['token_count'] = []
+        embeddings = []
+        embedding_id = embedding_id_start
+        for document in documents:
+            document_metadata, document_embeddings, embedding_id = self._build_database_values_for_document(
+                document,
+                embedding_id
+            )
+            for key, values in document_metadata.items():
+                item_metadata[key].extend(values)
+            embeddings.extend(document_embeddings)
+
         # Blend the metadata and embeddings into a single table
         textual_data = pa.Table.from_pydict(item_metadata)
         et = vec_to_table(embeddings)
         items = textual_data.append_column("vector", et["vector"])
 
-        self.log.info("Adding document %s %s embeddings to LanceDB.", document['id'], len(embeddings))
+        self.log.info("Adding %s documents %s embeddings to LanceDB.", len(documents), len(embeddings))
+        self._write(items, create_table)
+        return embedding_id
+
+    def _write(self, items, create_table: bool=False) -> None:
+        """Buffers rows for the embeddings table, writing them once the buffer is full.
+
+        Writing few large batches keeps the number of dataset fragments low.
+
+        Args:
+            items (pa.Table): The rows to write.
+            create_table (bool): Whether to (re)create the table with the rows, written immediately.
+        """
         if create_table:
+            self.pending_writes = []
+            self.pending_rows = 0
             self._create_table(items)
-        else:
-            self.embeddings_table.add(items)
-        return embedding_id
+            return
+        self.pending_writes.append(items)
+        self.pending_rows += items.num_rows
+        if self.pending_rows >= self.write_buffer_rows:
+            self.flush_writes()
+
+    def flush_writes(self) -> None:
+        """Writes the buffered rows to the embeddings table as a single fragment."""
+        if not self.pending_writes:
+            return
+        items = pa.concat_tables(self.pending_writes)
+        self.pending_writes = []
+        self.pending_rows = 0
+        self.log.info("Writing %s buffered rows to LanceDB.", items.num_rows)
+        if self.embeddings_table is None:
+            self._create_table(items)
+            return
+        self.embeddings_table.add(items)
+
+    def optimize(self, cleanup_older_than_hours: float=None) -> None:
+        """Compacts the embeddings table's fragments and removes old table versions.
+
+        Args:
+            cleanup_older_than_hours (float): The age of the table versions to remove.
+                                     Defaults to DEFAULT_CLEANUP_OLDER_THAN_HOURS.
+        """
+        self.flush_writes()
+        if self.embeddings_table is None:
+            return
+        if cleanup_older_than_hours is None:
+            cleanup_older_than_hours = self.DEFAULT_CLEANUP_OLDER_THAN_HOURS
+        start_time = time.time()
+        self.embeddings_table.optimize(
+            cleanup_older_than=timedelta(hours=cleanup_older_than_hours)
+        )
+        self.log.info(
+            "Optimized LanceDB table %s in %.2fs, %s rows in %s fragments.",
+            self.EMBEDDINGS_TABLE_NAME,
+            time.time() - start_time,
+            self.embeddings_table.count_rows(),
+            len(self.embeddings_table.to_lance().get_fragments())
+        )
 
     def _build_database_values_for_document(
             self,
@@ -130,6 +266,7 @@ class LanceDB:
                         - id: The document's ID.
                         - raw_chunks list(str): The raw chunks of the document.
                         - embeddings list(Tensor): The embeddings of the document.
+                        - token_counts list(int): The LLM token count of each raw chunk. Optional.
             embedding_id_start (int): The starting embedding id.
 
         Returns:
@@ -159,14 +296,138 @@ class LanceDB:
             'chunk_id': chunk_ids,
             'metadata': metadata
         }
+        if 'token_counts' in document:
+            item_metadata['token_count'] = list(document['token_counts'])
 
         return item_metadata, embeddings, embedding_id
 
+    def delete_documents(self, doc_ids: list) -> None:
+        """Deletes the embeddings of the given documents.
+
+        Args:
+            doc_ids (list): The IDs of the documents to delete.
+        """
+        self.flush_writes()
+        if self.embeddings_table is None:
+            return
+        for start in range(0, len(doc_ids), self.DELETE_BATCH_SIZE):
+            batch = doc_ids[start:start + self.DELETE_BATCH_SIZE]
+            id_list = ', '.join(f"'{doc_id}'" for doc_id in batch)
+            self.embeddings_table.delete(f"doc_id IN ({id_list})")
+        self.log.info("Deleted %s documents from LanceDB.", len(doc_ids))
+
+    def create_indexes(self) -> None:
+        """Builds the scalar indexes and, if enabled, the vector index on the embeddings table.
+
+        The vector index is opt-in with index.enabled, as it makes searches
+        approximate. It is skipped while the table holds fewer rows than
+        index.min_rows, as a flat scan is both exact and fast at that size.
+        A vector index left by an earlier build is dropped once disabled.
+        """
+        self.flush_writes()
+        if self.embeddings_table is None:
+            return
+        num_rows = self.embeddings_table.count_rows()
+
+        for column in self.index_config.get('scalar_columns', self.DEFAULT_SCALAR_INDEX_COLUMNS):
+            self.embeddings_table.create_scalar_index(column, index_type='BTREE', replace=True)
+
+        if not self._vector_index_enabled():
+            for index in self.embeddings_table.list_indices():
+                if 'vector' in index.columns:
+                    self.log.info("Vector index is disabled, dropping %s.", index.name)
+                    self.embeddings_table.drop_index(index.name)
+            return
+
+        min_rows = int(self.index_config.get('min_rows', self.DEFAULT_INDEX_MIN_ROWS))
+        if num_rows < min_rows:
+            self.log.info(
+                "Skipping vector index, %s rows is below the minimum of %s.",
+                num_rows,
+                min_rows
+            )
+            return
+
+        index_type = self.VECTOR_INDEX_TYPES[str(self.index_config.get('type', 'IVF_PQ')).upper()]
+        index_args = {
+            'metric': self.index_config.get('metric', 'L2'),
+            'num_partitions': int(
+                self.index_config.get('num_partitions', max(1, int(math.sqrt(num_rows))))
+            ),
+            'index_type': index_type,
+            'replace': True
+        }
+        if 'num_sub_vectors' in self.index_config:
+            index_args['num_sub_vectors'] = int(self.index_config['num_sub_vectors'])
+        if index_type != 'IVF_PQ':
+            for key in ('m', 'ef_construction'):
+                if key in self.index_config:
+                    index_args[key] = int(self.index_config[key])
+
+        self.log.info("Building %s index on %s rows.", index_type, num_rows)
+        start_time = time.time()
+        self.embeddings_table.create_index(**index_args)
+        self.log.info(
+            "Built %s index in %.2fs, indexes use %.2f MiB on disk.",
+            index_type,
+            time.time() - start_time,
+            self._get_index_size() / (1024 * 1024)
+        )
+
+    def _vector_index_enabled(self) -> bool:
+        """Checks if a vector index is configured.
+
+        Returns:
+            bool: True if index.enabled is set, False otherwise.
+        """
+        return bool(self.index_config.get('enabled', False))
+
+    def _get_index_size(self) -> int:
+        """Gets the on-disk size of the embeddings table's indexes.
+
+        Returns:
+            int: The size of the indexes in bytes.
+        """
+        index_path = os.path.join(
+            self.db_filepath,
+            f'{self.EMBEDDINGS_TABLE_NAME}.lance',
+            '_indices'
+        )
+        size = 0
+        for root, _, files in os.walk(index_path):
+            for filename in files:
+                size += os.path.getsize(os.path.join(root, filename))
+        return size
+
+    def _search(self, query: str, limit: int, max_distance: int):
+        """Builds a similarity search with the configured query-time parameters.
+
+        Args:
+            query (str): The query to search for.
+            limit (int): The maximum number of results to return.
+            max_distance (int): The maximum distance to return.
+
+        Returns:
+            LanceQueryBuilder: The search.
+        """
+        search = self.embeddings_table.search(query).distance_range(upper_bound=max_distance).limit(limit)
+        if 'nprobes' in self.query_config:
+            search = search.nprobes(int(self.query_config['nprobes']))
+        refine_factor = self.query_config.get('refine_factor')
+        if refine_factor is None and self._vector_index_enabled() \
+                and str(self.index_config.get('type', 'IVF_PQ')).upper() == 'IVF_PQ':
+            # Re-rank PQ candidates on full vectors, so distances stay comparable to max_distance.
+            refine_factor = self.DEFAULT_PQ_REFINE_FACTOR
+        if refine_factor is not None:
+            search = search.refine_factor(int(refine_factor))
+        return search
+
     def query(
             self,
             query: str,
             limit: int=25,
-            max_distance: int=5
+            max_distance: int=5,
+            return_vectors: bool=False
         ) -> list:
         """Queries the database for embedding similarity.
 
@@ -174,14 +435,24 @@ class LanceDB:
             query (str): The query to search for.
             limit (int): The maximum number of results to return.
             max_distance (int): The maximum distance to return.
+            return_vectors (bool): Whether to also return the stored embeddings of the results.
 
         Returns:
-            list: The results of the query.
+            list: The results of the query. If return_vectors is set, a tuple of
+                  the results and a contiguous float32 array of their embeddings,
+                  one row per result.
         """
-        results = self.embeddings_table.search(query).distance_range(upper_bound=max_distance).limit(limit).to_df()
-        # results = self.embeddings_table.search(query).distance_range(upper_bound=max_distance).to_df()
+        results = self._search(query, limit, max_distance).to_df()
+        vectors = None
+        if return_vectors:
+            if results.empty:
+                vectors = np.empty((0, 0), dtype=np.float32)
+            else:
+                vectors = np.ascontiguousarray(np.stack(results['vector'].to_numpy()), dtype=np.float32)
         # Instead of specifying columns, we return all data but the vector.
         results = results.drop(columns=['vector'])
+        if return_vectors:
+            return results, vectors
         return results
 
     ## QA Methods
@@ -191,23 +462,33 @@ class LanceDB:
             question_metadata: dict,
             create_table: bool=False
         ) -> None:
+        """Adds a QA question to lancedb.
 
-        # NOTE: Each value is wrapped in a list to form a 1-row DataFrame.
-        # This ensures all columns have equal-length arrays, as required by Pandas and LanceDB.
-        # Without this, you'll get "ValueError: All arrays must be of the same length".
-        # See: https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.html
-        for key in question_metadata:
-            question_metadata[key] = [question_metadata[key]]
+        Args:
+            question_metadata (dict): The question's data, including its vector.
+            create_table (bool): Whether to create the table if it does not exist.
+        """
+        self.add_qa_questions([question_metadata], create_table)
 
-        # OLD data = pa.Table.from_pydict(question_metadata)
-        df = pd.DataFrame(question_metadata)
+    def add_qa_questions(
+            self,
+            questions: list,
+            create_table: bool=False
+        ) -> None:
+        """Adds many QA questions to lancedb as a single write.
 
-        self.log.info("Adding question %s to LanceDB.", df)
+        Args:
+            questions (list): The questions' data, each including its vector.
+            create_table (bool): Whether to create the table if it does not exist.
+        """
+        df = pd.DataFrame(questions)
+
+        self.log.info("Adding %s questions to LanceDB.", len(df))
         if create_table:
             self._create_table(df)
         else:
             self.embeddings_table.add(df)
- 
+
     def question_query(
             self,
             query: str,
@@ -224,12 +505,16 @@ class LanceDB:
         Returns:
             list: The results of the query.
         """
-        results = self.embeddings_table.search(query).distance_range(upper_bound=max_distance).limit(limit).to_df()
+        results = self._search(query, limit, max_distance).to_df()
         # results = self.embeddings_table.search(query).distance_range(upper_bound=max_distance).to_df()
         # Instead of specifying columns, we return all data but the vector.
         results = results.drop(columns=['vector'])
         return results
 
+    def table_exists(self) -> bool:
+        """Checks if the embeddings table exists."""
+        return self.embeddings_table is not None
+
     def has_qa_data(self) -> bool:
         """Checks if the QA table exists and has at least one row."""
         try:
@@ -1,27 +1,41 @@
 import os
 import sqlite3
 import sys
+import threading
 from logging import Logger
 
 from deckard.core import get_data_dir
+from deckard.core.index_version import get_index_version
 from .context_database import ContextDatabase
 
 class SQLite(ContextDatabase):
     """Provides a SQLite interface for adding and querying embeddings.
 
+    Writes are not committed until commit() is called, so that a build runs
+    as a single transaction.
+
     Args:
         name (str): The name of the database.
         log (Logger): The logger for the database.
         create_if_not_exists (bool): Whether to create the database if it does not exist.
+        config (dict): The context database configuration, if any. If its
+               'preload' element is set, the chunks are loaded into memory. If its
+               'pipeline' element is set, they are reloaded whenever the pipeline is rebuilt.
 
     Attributes:
         CONTEXT_TABLE_NAME (str): The name of the table for the context.
         DATA_PATH (str): The path to the data directory.
+        LOOKUP_BATCH_SIZE (int): The maximum number of document IDs per lookup query.
         log (Logger): The logger for the database.
         connection (sqlite3.Connection): The connection to the database.
+        lock (threading.RLock): The lock guarding the connection.
+        pipeline (str): The name of the pipeline whose RAG index version the preloaded chunks follow, if any.
+        preloaded_chunks (dict): The chunks loaded into memory, keyed by document ID. None if not preloaded.
+        preloaded_version (str): The RAG index version of the pipeline when the chunks were preloaded.
     """
 
     CONTEXT_TABLE_NAME = "llm_document_chunks"
+    LOOKUP_BATCH_SIZE = 900
     DATA_PATH = os.path.join(
         get_data_dir(),
         'databases',
@@ -31,9 +45,15 @@ class SQLite(ContextDatabase):
     def __init__(self,
             name: str,
             log: Logger,
-            create_if_not_exists: bool=False
+            create_if_not_exists: bool=False,
+            config: dict=None
         ) -> None:
         self.log = log
+        config = config or {}
+        self.lock = threading.RLock()
+        self.pipeline = config.get('pipeline')
+        self.preloaded_chunks = None
+        self.preloaded_version = None
         db_filepath = os.path.join(self.DATA_PATH, '.' + name)
         if not os.path.exists(self.DATA_PATH):
             if create_if_not_exists:
@@ -47,27 +67,152 @@ class SQLite(ContextDatabase):
 
         try:
             self.connection = sqlite3.connect(db_filepath, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
         except Exception:
             log.error("Failed to connect to database: %s", name)
+            return
+
+        if self._table_exists():
+            self._create_index()
+            self.connection.commit()
+            if config.get('preload', False):
+                self.preload()
+
+    def _table_exists(self):
+        row = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+            (self.CONTEXT_TABLE_NAME,)
+        ).fetchone()
+        return row is not None
 
     def flush_data(self):
-        self.connection.execute(f"DROP TABLE IF EXISTS {self.CONTEXT_TABLE_NAME}")
+        with self.lock:
+            self.connection.execute(f"DROP TABLE IF EXISTS {self.CONTEXT_TABLE_NAME}")
 
     def _create_table(self):
         data = "doc_id TEXT, chunk_id INT, text TEXT"
         self.connection.execute(f"CREATE TABLE {self.CONTEXT_TABLE_NAME} ({data})")
+        self._create_index()
+
+    def _create_index(self):
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.CONTEXT_TABLE_NAME}_doc_chunk "
+            f"ON {self.CONTEXT_TABLE_NAME} (doc_id, chunk_id)"
+        )
 
     def add_contexts(self, document, create_table=False):
-        if create_table:
-            self._create_table()
+        self.add_contexts_batch([document], create_table)
+
+    def add_contexts_batch(self, documents, create_table=False):
         rows = []
-        for idx, chunk in enumerate(document['raw_chunks']):
-            rows.append([
-                document['id'],
-                idx,
-                chunk
-            ])
-        self.log.info("Adding document %s context pieces to SQLite.", document['id'])
-        self.connection.executemany(f"INSERT INTO {self.CONTEXT_TABLE_NAME} VALUES (?,?,?)", rows)
-        self.connection.commit()
+        for document in documents:
+            for idx, chunk in enumerate(document['raw_chunks']):
+                rows.append([
+                    document['id'],
+                    idx,
+                    chunk
+                ])
+        self.log.info("Adding %s documents %s context pieces to SQLite.", len(documents), len(rows))
+        with self.lock:
+            if create_table:
+                self._create_table()
+            self.connection.executemany(f"INSERT INTO {self.CONTEXT_TABLE_NAME} VALUES (?,?,?)", rows)
+
+    def delete_documents(self, doc_ids):
+        with self.lock:
+            self.connection.executemany(
+                f"DELETE FROM {self.CONTEXT_TABLE_NAME} WHERE doc_id = ?",
+                [(doc_id,) for doc_id in doc_ids]
+            )
+        self.log.info("Deleted %s documents from SQLite.", len(doc_ids))
+
+    def commit(self):
+        """Commits the pending writes."""
+        with self.lock:
+            self.connection.commit()
+
+    def preload(self):
+        """Loads every chunk into memory, so lookups no longer query the database."""
+        chunks = {}
+        with self.lock:
+            # Read the version first, so a rebuild finishing during the load triggers another.
+            version = self._get_index_version()
+            rows = self.connection.execute(
+                f"SELECT doc_id, chunk_id, text FROM {self.CONTEXT_TABLE_NAME} ORDER BY doc_id, chunk_id"
+            ).fetchall()
+            for doc_id, chunk_id, text in rows:
+                chunks.setdefault(doc_id, []).append((chunk_id, text))
+            self.preloaded_chunks = chunks
+            self.preloaded_version = version
+        self.log.info("Preloaded %s chunks of %s documents from SQLite.", len(rows), len(chunks))
+
+    def _get_index_version(self):
+        """Gets the current RAG index version of the pipeline.
+
+        Returns:
+            str: The index version. None if no pipeline is set.
+        """
+        if self.pipeline is None:
+            return None
+        return get_index_version(self.pipeline, 'rag')
+
+    def sample_chunks(self, limit):
+        """Gets the text of randomly chosen chunks.
+
+        Args:
+            limit (int): The number of chunks.
+
+        Returns:
+            list: The chunk texts.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT text FROM {self.CONTEXT_TABLE_NAME} ORDER BY RANDOM() LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_chunks(self, doc_ids):
+        """Gets the chunks of many documents.
+
+        Args:
+            doc_ids (list): The IDs of the documents.
+
+        Returns:
+            dict: The (chunk_id, text) tuples of each document, ordered by
+                  chunk_id and keyed by document ID. Unknown documents are omitted.
+        """
+        doc_ids = list(dict.fromkeys(doc_ids))
+        if self.preloaded_chunks is not None:
+            with self.lock:
+                if self._get_index_version() != self.preloaded_version:
+                    self.log.info("Index of pipeline %s was rebuilt, reloading preloaded chunks.", self.pipeline)
+                    self.preload()
+                preloaded_chunks = self.preloaded_chunks
+            return {
+                doc_id: preloaded_chunks[doc_id]
+                for doc_id in doc_ids if doc_id in preloaded_chunks
+            }
+
+        chunks = {}
+        with self.lock:
+            for start in range(0, len(doc_ids), self.LOOKUP_BATCH_SIZE):
+                batch = doc_ids[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT doc_id, chunk_id, text FROM {self.CONTEXT_TABLE_NAME} "
+                    f"WHERE doc_id IN ({placeholders}) ORDER BY doc_id, chunk_id",
+                    batch
+                ).fetchall()
+                for doc_id, chunk_id, text in rows:
+                    chunks.setdefault(doc_id, []).append((chunk_id, text))
+        return chunks
 
+    def optimize(self):
+        """Rebuilds the database file to reclaim free pages and refreshes the query planner statistics."""
+        with self.lock:
+            self.connection.commit()
+            self.connection.execute("VACUUM")
+            self.connection.execute("ANALYZE")
+        self.log.info("Vacuumed and analyzed SQLite database.")
@@ -1 +1,4 @@
+from .cross_encoder_reranker import CrossEncoderReranker
+from .embedding_cache import EmbeddingCache, get_embedding_cache
 from .sentence_transformer_encoder import SentenceTransformerEncoder
+from .onnx_encoder import OnnxEncoder
@@ -0,0 +1,98 @@
+from logging import Logger
+
+from pandas import DataFrame
+from sentence_transformers import CrossEncoder
+from torch.cuda import OutOfMemoryError
+
+from deckard.core.utils import clear_gpu_memory, resolve_device, set_cpu_threads
+
+class CrossEncoderReranker:
+    """Reranks results by scoring (query, passage) pairs with a cross-encoder model.
+
+    Args:
+        model (str): The name of the cross-encoder model to use.
+        log (Logger): The logger for the reranker.
+        config (dict): The reranker configuration, if any. Its optional
+               elements are 'batch_size', 'max_length', 'score_threshold',
+               'device' (cpu, cuda, cuda:N or auto) and 'threads', the
+               number of CPU inference threads.
+
+    Attributes:
+        DEFAULT_BATCH_SIZE (int): The default number of pairs to score per batch.
+        batch_size (int): The number of pairs to score per batch.
+        device (str): The device the model runs on.
+        encoder (CrossEncoder): The cross-encoder model.
+        log (Logger): The logger for the reranker.
+        model (str): The name of the cross-encoder model.
+        score_threshold (float): The minimum score of a kept result. None keeps all results.
+    """
+
+    DEFAULT_BATCH_SIZE = 16
+
+    def __init__(self, model: str, log: Logger, config: dict=None) -> None:
+        config = config or {}
+        self.log = log
+        self.model = model
+        self.batch_size = int(config.get('batch_size', self.DEFAULT_BATCH_SIZE))
+        self.score_threshold = config.get('score_threshold')
+        self.device = resolve_device(config.get('device', 'cuda'), log)
+        if self.device == 'cpu':
+            set_cpu_threads(config.get('threads'), log)
+        log.info("Loading Cross Encoder Model: %s (%s)", model, self.device)
+        self.encoder = CrossEncoder(
+            model,
+            max_length=config.get('max_length'),
+            device=self.device
+        )
+
+    def rerank(self, query: str, results: DataFrame) -> DataFrame:
+        """Reranks the results based on the query.
+
+        Pairs longer than the model's maximum length are truncated. Results
+        scoring below the score threshold, if set, are dropped.
+
+        Args:
+            query (str): The query to use for reranking.
+            results (DataFrame): The results to rerank.
+
+        Returns:
+            DataFrame: The reranked results, sorted by a new column 'rerank_score'.
+        """
+        self.log.info("Reranking Results: %s", query)
+        if results.empty:
+            results.insert(2, "rerank_score", [], True)
+            return results
+        pairs = [[query, text] for text in results['text']]
+        new_scores = self._predict(pairs)
+        results.insert(2, "rerank_score", new_scores, True)
+        if self.score_threshold is not None:
+            kept = results['rerank_score'] >= float(self.score_threshold)
+            self.log.info("Pruned %s results below score %s", int((~kept).sum()), self.score_threshold)
+            results = results[kept]
+        return results.sort_values(by=["rerank_score"], ascending=False)
+
+    def _predict(self, pairs: list) -> list:
+        """Scores (query, passage) pairs, halving the batch size if the device runs out of memory.
+
+        Args:
+            pairs (list): The pairs to score.
+
+        Returns:
+            list: The score of each pair.
+        """
+        batch_size = self.batch_size
+        while True:
+            try:
+                return self.encoder.predict(
+                    pairs,
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                ).tolist()
+            except OutOfMemoryError:
+                clear_gpu_memory()
+                if batch_size <= 1:
+                    raise
+                batch_size = max(1, batch_size // 2)
+                self.batch_size = batch_size
+                self.log.warning("Out of memory while reranking, reducing batch size to %s", batch_size)
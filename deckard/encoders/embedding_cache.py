@@ -0,0 +1,199 @@
+"""Provides a persistent, on-disk cache of text embeddings."""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from logging import Logger
+
+import numpy as np
+
+from deckard.core import get_data_dir
+from deckard.core.config import get_embedding_cache_config
+
+class EmbeddingCache:
+    """Caches text embeddings on disk, keyed by encoder model and normalized text hash.
+
+    Vectors are stored as float32 blobs in a SQLite table.
+
+    Args:
+        log (Logger): The logger for the cache.
+        max_entries (int): The maximum number of cached embeddings. 0 disables the limit.
+
+    Attributes:
+        CACHE_TABLE_NAME (str): The name of the table for the embeddings.
+        DATA_PATH (str): The path to the cache directory.
+        DATABASE_FILENAME (str): The filename of the cache database.
+        LOOKUP_BATCH_SIZE (int): The number of hashes to look up per query.
+        connection (sqlite3.Connection): The connection to the cache database.
+        hits (int): The number of embeddings found in the cache.
+        lock (threading.Lock): The lock guarding the connection.
+        log (Logger): The logger for the cache.
+        max_entries (int): The maximum number of cached embeddings.
+        misses (int): The number of embeddings not found in the cache.
+    """
+
+    CACHE_TABLE_NAME = "embeddings"
+    DATA_PATH = os.path.join(
+        get_data_dir(),
+        'caches'
+    )
+    DATABASE_FILENAME = 'embeddings.sqlite'
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, log: Logger, max_entries: int=0) -> None:
+        self.log = log
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if not os.path.exists(self.DATA_PATH):
+            os.makedirs(self.DATA_PATH)
+        self.connection = sqlite3.connect(
+            os.path.join(self.DATA_PATH, self.DATABASE_FILENAME),
+            check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.CACHE_TABLE_NAME} ("
+            "model TEXT, text_hash TEXT, dimensions INT, vector BLOB, last_used REAL, "
+            "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.CACHE_TABLE_NAME}_last_used "
+            f"ON {self.CACHE_TABLE_NAME} (last_used)"
+        )
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Hashes the normalized form of a text.
+
+        Args:
+            text (str): The text to hash.
+
+        Returns:
+            str: The hash of the text.
+        """
+        normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get_many(self, model: str, texts: list[str]) -> list:
+        """Gets the cached embeddings of the texts.
+
+        Args:
+            model (str): The name of the encoder model.
+            texts (list[str]): The texts to look up.
+
+        Returns:
+            list: The cached embedding of each text, or None if it is not cached.
+        """
+        hashes = [self.hash_text(text) for text in texts]
+        unique_hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self.lock, self.connection:
+            for start in range(0, len(unique_hashes), self.LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT text_hash, vector FROM {self.CACHE_TABLE_NAME} "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[text_hash] = np.frombuffer(vector, dtype=np.float32)
+                self.connection.execute(
+                    f"UPDATE {self.CACHE_TABLE_NAME} SET last_used = ? "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [time.time(), model, *batch]
+                )
+        vectors = [found.get(text_hash) for text_hash in hashes]
+        hits = sum(1 for vector in vectors if vector is not None)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model: str, texts: list[str], vectors) -> None:
+        """Adds embeddings to the cache.
+
+        Args:
+            model (str): The name of the encoder model.
+            texts (list[str]): The texts that were encoded.
+            vectors (np.ndarray): The embeddings of the texts, one row per text.
+        """
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model, self.hash_text(text), vector.shape[-1], vector.tobytes(), now))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.CACHE_TABLE_NAME} VALUES (?,?,?,?,?)",
+                rows
+            )
+
+    def count(self) -> int:
+        """Counts the cached embeddings.
+
+        Returns:
+            int: The number of cached embeddings.
+        """
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM {self.CACHE_TABLE_NAME}"
+            ).fetchone()[0]
+
+    def evict(self, max_entries: int, vacuum: bool=False) -> int:
+        """Evicts the least recently used embeddings beyond a maximum count.
+
+        Args:
+            max_entries (int): The number of embeddings to keep.
+            vacuum (bool): Whether to reclaim the freed disk space afterwards.
+
+        Returns:
+            int: The number of embeddings evicted.
+        """
+        excess = self.count() - max_entries
+        if excess <= 0:
+            return 0
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"DELETE FROM {self.CACHE_TABLE_NAME} WHERE (model, text_hash) IN ("
+                f"SELECT model, text_hash FROM {self.CACHE_TABLE_NAME} ORDER BY last_used ASC LIMIT ?)",
+                [excess]
+            )
+        if vacuum:
+            with self.lock:
+                self.connection.execute("VACUUM")
+        self.log.info("Evicted %s embeddings from the cache.", excess)
+        return excess
+
+    def enforce_limit(self) -> int:
+        """Evicts embeddings beyond the configured maximum count.
+
+        Returns:
+            int: The number of embeddings evicted.
+        """
+        if not self.max_entries:
+            return 0
+        return self.evict(self.max_entries)
+
+    def report(self) -> None:
+        """Logs the cache hit statistics."""
+        self.log.info("Embedding cache: %s hits, %s misses.", self.hits, self.misses)
+
+
+def get_embedding_cache(log: Logger) -> EmbeddingCache:
+    """Gets the embedding cache, if it is enabled in the configuration.
+
+    Args:
+        log (Logger): The logger for the cache.
+
+    Returns:
+        EmbeddingCache: The embedding cache. None if it is disabled.
+    """
+    config = get_embedding_cache_config()
+    if not config.get('enabled', False):
+        return None
+    return EmbeddingCache(log, int(config.get('max_entries', 0)))
@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+from logging import Logger
+
+import numpy as np
+from huggingface_hub import hf_hub_download
+from huggingface_hub.utils import EntryNotFoundError
+
+from deckard.core import get_data_dir
+from deckard.core.utils import resolve_device
+from .sentence_transformer_encoder import SentenceTransformerEncoder
+
+class OnnxEncoder(SentenceTransformerEncoder):
+    """Encodes text with a Sentence Transformer model exported to ONNX and run by ONNX Runtime.
+
+    The model is exported on first use and cached under data_dir/models/onnx,
+    optionally int8 dynamic-quantized. Pooling and normalization follow the
+    model's Sentence Transformer configuration. Requires the 'onnx' extra.
+
+    Args:
+        model (str): The name of the Sentence Transformer model to use.
+        log (Logger): The logger for the encoder.
+        config (dict): The encoder configuration, if any. Its optional elements
+               are 'device' (cpu, cuda, cuda:N or auto), 'threads', the
+               number of CPU inference threads, and 'quantize', whether
+               to use int8 dynamic quantization.
+
+    Attributes:
+        ONNX_MODEL_CACHE_PATH (str): The path to the exported model cache.
+        QUANTIZED_FILENAME (str): The filename of the quantized model.
+        export_path (str): The path to the exported model.
+        max_seq_length (int): The maximum number of tokens per value.
+        normalize (bool): Whether the embeddings are L2-normalized.
+        pooling_mode (str): The token pooling mode: mean, cls or max.
+        quantize (bool): Whether the model is int8 dynamic-quantized.
+        session (ORTModelForFeatureExtraction): The ONNX Runtime model.
+        tokenizer (PreTrainedTokenizer): The model's tokenizer.
+    """
+
+    ONNX_MODEL_CACHE_PATH = os.path.join(
+        get_data_dir(),
+        'models',
+        'onnx'
+    )
+    QUANTIZED_FILENAME = 'model_quantized.onnx'
+
+    def __init__(self, model: str, log: Logger, config: dict=None) -> None:
+        config = config or {}
+        self.log = log
+        self.model = model
+        self.max_batch_size = None
+        self.cache = None
+        self.device = resolve_device(config.get('device', 'cpu'), log)
+        self.quantize = bool(config.get('quantize', False))
+        # Keep ONNX (and quantized) vectors apart from PyTorch ones in the embedding cache.
+        self.cache_id = f"{model}#onnx-int8" if self.quantize else f"{model}#onnx"
+
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+            import onnxruntime
+        except ImportError:
+            log.error("The ONNX encoder requires the 'onnx' extra: poetry install -E onnx")
+            sys.exit(1)
+
+        self._load_sentence_transformer_config()
+        self.export_path = os.path.join(
+            self.ONNX_MODEL_CACHE_PATH,
+            model.replace('/', '__') + ('-int8' if self.quantize else '')
+        )
+        self._export(ORTModelForFeatureExtraction)
+
+        session_options = onnxruntime.SessionOptions()
+        if config.get('threads'):
+            session_options.intra_op_num_threads = int(config['threads'])
+        provider = 'CUDAExecutionProvider' if self.device.startswith('cuda') else 'CPUExecutionProvider'
+        provider_options = {}
+        if ':' in self.device:
+            provider_options['device_id'] = int(self.device.split(':')[1])
+
+        log.info("Loading ONNX Model: %s (%s)", self.export_path, provider)
+        self.session = ORTModelForFeatureExtraction.from_pretrained(
+            self.export_path,
+            file_name=self.QUANTIZED_FILENAME if self.quantize else 'model.onnx',
+            provider=provider,
+            provider_options=provider_options,
+            session_options=session_options
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(self.export_path)
+
+    def _export(self, model_class) -> None:
+        """Exports the model to ONNX, and quantizes it, unless a cached export exists.
+
+        Args:
+            model_class (type): The ONNX Runtime model class to export with.
+        """
+        if os.path.isfile(os.path.join(self.export_path, 'model.onnx')):
+            return
+        self.log.info("Exporting %s to ONNX: %s", self.model, self.export_path)
+        from transformers import AutoTokenizer
+        exported = model_class.from_pretrained(self.model, export=True)
+        exported.save_pretrained(self.export_path)
+        AutoTokenizer.from_pretrained(self.model).save_pretrained(self.export_path)
+
+        if self.quantize:
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            self.log.info("Quantizing %s to int8.", self.model)
+            quantizer = ORTQuantizer.from_pretrained(self.export_path)
+            quantizer.quantize(
+                save_dir=self.export_path,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            )
+
+    def _load_sentence_transformer_config(self) -> None:
+        """Reads the pooling, normalization and sequence length from the model's configuration."""
+        self.pooling_mode = 'mean'
+        self.normalize = False
+        self.max_seq_length = 512
+
+        modules = self._read_model_json('modules.json') or []
+        for module in modules:
+            if module.get('type', '').endswith('Normalize'):
+                self.normalize = True
+            if module.get('type', '').endswith('Pooling'):
+                pooling = self._read_model_json(f"{module['path']}/config.json") or {}
+                if pooling.get('pooling_mode_cls_token'):
+                    self.pooling_mode = 'cls'
+                elif pooling.get('pooling_mode_max_tokens'):
+                    self.pooling_mode = 'max'
+
+        bert_config = self._read_model_json('sentence_bert_config.json') or {}
+        self.max_seq_length = int(bert_config.get('max_seq_length', self.max_seq_length))
+
+    def _read_model_json(self, filename: str) -> dict:
+        """Reads a JSON file from the model's repository.
+
+        Args:
+            filename (str): The path of the file in the repository.
+
+        Returns:
+            dict: The file's contents. None if the file does not exist.
+        """
+        try:
+            with open(hf_hub_download(self.model, filename), encoding='utf-8') as f:
+                return json.load(f)
+        except EntryNotFoundError:
+            return None
+
+    def encode(self, value: str) -> np.ndarray:
+        """Encodes a textual value into a vector.
+
+        Args:
+            value (str): The value to encode.
+
+        Returns:
+            np.ndarray: The encoded value.
+        """
+        return self._encode_batch([value], 1)[0]
+
+    def _encode_batch(self, values: list[str], batch_size: int) -> np.ndarray:
+        """Encodes a list of textual values with the ONNX model.
+
+        Args:
+            values (list[str]): The values to encode.
+            batch_size (int): The number of values to encode per model call.
+
+        Returns:
+            np.ndarray: The encoded values.
+        """
+        embeddings = []
+        for start in range(0, len(values), batch_size):
+            inputs = self.tokenizer(
+                values[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            outputs = self.session(**inputs)
+            embeddings.append(self._pool(outputs.last_hidden_state, inputs['attention_mask']))
+        if not embeddings:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(embeddings).astype(np.float32, copy=False)
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Pools token embeddings into one embedding per value.
+
+        Args:
+            token_embeddings (np.ndarray): The token embeddings.
+            attention_mask (np.ndarray): The attention mask of the tokens.
+
+        Returns:
+            np.ndarray: The pooled embeddings.
+        """
+        token_embeddings = np.asarray(token_embeddings, dtype=np.float32)
+        mask = np.asarray(attention_mask, dtype=np.float32)[..., None]
+        if self.pooling_mode == 'cls':
+            pooled = token_embeddings[:, 0]
+        elif self.pooling_mode == 'max':
+            pooled = np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        else:
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
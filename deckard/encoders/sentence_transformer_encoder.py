@@ -1,10 +1,13 @@
 from logging import Logger
 
+import numpy as np
 from pandas import DataFrame
 from sentence_transformers import SentenceTransformer, util as st_util
 from torch import Tensor
+from torch.cuda import OutOfMemoryError
 
-from deckard.core.utils import clear_gpu_memory
+from deckard.core.utils import clear_gpu_memory, resolve_device, set_cpu_threads
+from .embedding_cache import EmbeddingCache
 
 class SentenceTransformerEncoder:
     """Encodes text using the Sentence Transformer model.
@@ -12,19 +15,46 @@ class SentenceTransformerEncoder:
     Args:
         model (str): The name of the Sentence Transformer model to use.
         log (Logger): The logger for the encoder.
+        config (dict): The encoder configuration, if any. Its optional elements
+               are 'device' (cpu, cuda, cuda:N or auto) and 'threads', the
+               number of CPU inference threads.
 
     Attributes:
+        DEFAULT_BATCH_SIZE (int): The default number of values to encode per batch.
+        cache (EmbeddingCache): The embedding cache to consult before encoding, if any.
+        cache_id (str): The identity of the encoder's embeddings in the cache.
+        device (str): The device the model runs on.
         encoder (SentenceTransformer): The Sentence Transformer model to use.
         log (Logger): The logger for the encoder.
+        max_batch_size (int): The largest batch size known to fit in memory.
+        model (str): The name of the Sentence Transformer model.
     """
 
-    def __init__(self, model: str, log: Logger) -> None:
+    DEFAULT_BATCH_SIZE = 32
+
+    def __init__(self, model: str, log: Logger, config: dict=None) -> None:
+        config = config or {}
         self.log = log
-        log.info("Loading Sentence Transformer Model: %s", model)
+        self.model = model
+        self.cache_id = model
+        self.device = resolve_device(config.get('device', 'cuda'), log)
+        if self.device == 'cpu':
+            set_cpu_threads(config.get('threads'), log)
+        log.info("Loading Sentence Transformer Model: %s (%s)", model, self.device)
         self.encoder = SentenceTransformer(
             model,
-            device='cuda'
+            device=self.device
         )
+        self.max_batch_size = None
+        self.cache = None
+
+    def use_cache(self, cache: EmbeddingCache) -> None:
+        """Sets the embedding cache to consult before encoding batches.
+
+        Args:
+            cache (EmbeddingCache): The embedding cache.
+        """
+        self.cache = cache
 
     def encode(self, value: str) -> Tensor:
         """Encodes a textual value into a Tensor.
@@ -37,35 +67,92 @@ class SentenceTransformerEncoder:
         """
         return self.encoder.encode(value)
 
-    def rerank(self, query: str, results: DataFrame) -> DataFrame:
+    def encode_batch(self, values: list[str], batch_size: int=DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """Encodes a list of textual values into a 2-D array, one row per value.
+
+        If a cache is set, only the values missing from it are encoded.
+
+        Args:
+            values (list[str]): The values to encode.
+            batch_size (int): The number of values to encode per model call.
+
+        Returns:
+            np.ndarray: The encoded values.
+        """
+        if self.cache is None or not values:
+            return self._encode_batch(values, batch_size)
+
+        vectors = self.cache.get_many(self.cache_id, values)
+        missing = [idx for idx, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_values = [values[idx] for idx in missing]
+            encoded = self._encode_batch(missing_values, batch_size)
+            self.cache.put_many(self.cache_id, missing_values, encoded)
+            for idx, vector in zip(missing, encoded):
+                vectors[idx] = vector
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def _encode_batch(self, values: list[str], batch_size: int) -> np.ndarray:
+        """Encodes a list of textual values with the model.
+
+        If the device runs out of memory, the batch size is halved and the
+        encoding retried. The reduced size is remembered for later calls.
+
+        Args:
+            values (list[str]): The values to encode.
+            batch_size (int): The number of values to encode per model call.
+
+        Returns:
+            np.ndarray: The encoded values.
+        """
+        if self.max_batch_size is not None:
+            batch_size = min(batch_size, self.max_batch_size)
+        while True:
+            try:
+                return self.encoder.encode(
+                    values,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            except OutOfMemoryError:
+                clear_gpu_memory()
+                if batch_size <= 1:
+                    raise
+                batch_size = max(1, batch_size // 2)
+                self.max_batch_size = batch_size
+                self.log.warning("Out of memory while encoding, reducing batch size to %s", batch_size)
+
+    def rerank(
+            self,
+            query: str,
+            results: DataFrame,
+            vectors: np.ndarray=None,
+            query_vector: np.ndarray=None
+        ) -> DataFrame:
         """Reranks the results based on the query.
 
+        The query is encoded once and the result texts in a single batch, then
+        scored with one cosine similarity operation. If the results' stored
+        embeddings are given, the texts are not encoded at all.
+
         Args:
             query (str): The query to use for reranking.
             results (DataFrame): The results to rerank.
+            vectors (np.ndarray): The results' stored embeddings from this model, one row per result.
+            query_vector (np.ndarray): The query's embedding from this model.
 
         Returns:
             DataFrame: The reranked results, sorted by a new column 'rerank_score'.
         """
-        new_scores = []
         self.log.info("Reranking Results: %s", query)
-        for ind in results.index:
-            clear_gpu_memory()
-            result_text = results['text'][ind]
-            new_scores.append(self._compute_similarity(query, result_text))
+        if results.empty:
+            results.insert(2, "rerank_score", [], True)
+            return results
+        if query_vector is None:
+            query_vector = self.encode(query)
+        if vectors is None:
+            vectors = self.encode_batch(list(results['text']))
+        new_scores = st_util.cos_sim(query_vector, vectors)[0].tolist()
         results.insert(2, "rerank_score", new_scores, True)
         return results.sort_values(by=["rerank_score"], ascending=False)
-
-    def _compute_similarity(self, query: str, text:str) -> float:
-        """Computes the similarity between the query and the text.
-
-        Args:
-            query (str): The query.
-            text (str): The text to compare to the query.
-
-        Returns:
-            float: The similarity score.
-        """
-        query_vector = self.encode(query)
-        text_vector = self.encode(text)
-        return st_util.cos_sim(query_vector, text_vector).item()
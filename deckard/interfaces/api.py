@@ -1,3 +1,4 @@
+import queue
 import socket
 import signal
 import sys
@@ -5,17 +6,18 @@ import sys
 from filelock import FileLock
 from flask import Flask, Response, g, request
 from logging import Logger
-from threading import Lock
+from threading import Lock, Thread
 from waitress import serve as waitress_serve
 
 from deckard.core import get_logger, json_dumper, list_of_dicts_to_dict, get_api_gpu_exclusive_mode
 from deckard.core.builders import build_llm_chains, build_rag_stacks
-from deckard.core.config import get_api_host, get_api_llm_config, get_api_port, get_gpu_lockfile
-from deckard.core.time import cur_timestamp, TimingManager
-from deckard.core.utils import report_memory_use
-from deckard.llm import LLM, LLMQuery, ResponseVerifier, MaliciousClassifier, CompoundClassifier, CompoundResponseSummarizer, ResponseSourceExtractor, fail_response
-from deckard.interfaces.services import build_qa_stacks, query_qa_stack
-from deckard.response import ApiResponse
+from deckard.core.model_registry import close_stacks
+from deckard.core.config import get_api_host, get_api_jobs_config, get_api_llm_config, get_api_preflight_classifier, get_api_port, get_gpu_lockfile
+from deckard.core.time import cur_timestamp, time_since, TimingManager
+from deckard.core.utils import gen_uuid, report_memory_use
+from deckard.llm import LLM, LLMQuery, get_prefix_cache, ResponseVerifier, MaliciousClassifier, CompoundClassifier, PreflightClassifier, CompoundResponseSummarizer, ResponseSourceExtractor, fail_response
+from deckard.interfaces.services import build_qa_stacks, query_qa_stack, JobQueue, QueryJob
+from deckard.response import ApiResponse, get_response_cache
 
 DECKARD_CMD_STRING = 'api:start'
 
@@ -31,7 +33,18 @@ qa_stacks = None
 stacks = None
 llm = None
 chains = None
+prefix_cache = None
 timings = TimingManager()
+preflight_classifier = get_api_preflight_classifier()
+response_cache = get_response_cache(logger)
+jobs_config = get_api_jobs_config()
+# run_query_job is defined below, resolve it when a job runs.
+job_queue = JobQueue(
+    lambda job: run_query_job(job),
+    logger,
+    int(jobs_config.get('max_queued', 32)),
+    int(jobs_config.get('retention_seconds', 3600))
+)
 
 @app.before_request
 def before_request():
@@ -59,7 +72,7 @@ def health_check():
 @app.route("/query/raw", methods=['POST'])
 def rawquery():
     """Direct LLM query. Not logged or for general use."""
-    global stacks, llm, chains, timings
+    global stacks, llm, chains, prefix_cache, timings
 
     data = request.json
     context = data.get('context')
@@ -74,7 +87,8 @@ def rawquery():
         if not gpu_exclusive:
             llm = LLM(logger, get_api_llm_config()).get()
             logger.info("Building LLM Chains...")
-            chains = build_llm_chains(llm)
+            prefix_cache = get_prefix_cache(llm, logger)
+            chains = build_llm_chains(llm, prefix_cache)
             
         chain = chains['chain-context-plus']
         chain_reponse = chain.invoke(
@@ -92,46 +106,211 @@ def rawquery():
 @app.route("/query/v1", methods=['POST'])
 def libpages_query():
     """RAG query endpoint."""
-    global stacks, qa_stacks, llm, chains, timings
+    status, payload = answer_query(request.json)
+    return Response(json_dumper(payload, pretty=False), status=status, mimetype='application/json')
 
+
+# Streaming RAG query endpoint.
+@app.route("/query/v1/stream", methods=['POST'])
+def libpages_query_stream():
+    """RAG query endpoint, streaming the pipeline stages and answer tokens as server-sent events."""
     data = request.json
+    events = queue.Queue()
+
+    def run_query():
+        try:
+            status, payload = answer_query(
+                data,
+                lambda stage: events.put(('stage', {'stage': stage})),
+                lambda query_key, text: events.put(('token', {'query': query_key, 'text': text}))
+            )
+            events.put(('complete' if status == 200 else 'error', payload))
+        except Exception as e:
+            logger.exception("Error in streaming query:")
+            events.put(('error', {'error': str(e)}))
+        finally:
+            events.put(None)
+
+    # The pipeline reports its progress through callbacks, so it runs on its
+    # own thread while the response generator relays the events.
+    Thread(target=run_query, daemon=True).start()
+
+    def stream_events():
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield format_sse_event(*event)
+
+    return Response(
+        stream_events(),
+        status=200,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Asynchronous RAG query job endpoints.
+@app.route("/query/v1/jobs", methods=['POST'])
+def submit_query_job():
+    """Queues a RAG query, returning its job ID immediately."""
+    job = job_queue.submit(request.json)
+    if job is None:
+        response = {'error': 'The job queue is full, try again later.'}
+        return Response(json_dumper(response, pretty=False), status=503, mimetype='application/json')
+    response = job_queue.status(job)
+    response.update({
+        'status_url': f"/query/v1/jobs/{job.id}",
+        'result_url': f"/query/v1/jobs/{job.id}/result"
+    })
+    return Response(json_dumper(response, pretty=False), status=202, mimetype='application/json')
+
+
+@app.route("/query/v1/jobs/<job_id>", methods=['GET'])
+def query_job_status(job_id):
+    """Reports the queue position and pipeline stage of a RAG query job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return Response(json_dumper({'error': 'Job not found.'}, pretty=False), status=404, mimetype='application/json')
+    return Response(json_dumper(job_queue.status(job), pretty=False), status=200, mimetype='application/json')
+
+
+@app.route("/query/v1/jobs/<job_id>/result", methods=['GET'])
+def query_job_result(job_id):
+    """Returns the response of a finished RAG query job, or its status while it is unfinished."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return Response(json_dumper({'error': 'Job not found.'}, pretty=False), status=404, mimetype='application/json')
+    if job.status == 'failed':
+        return Response(json_dumper(job_queue.status(job), pretty=False), status=500, mimetype='application/json')
+    if job.status != 'complete':
+        return Response(json_dumper(job_queue.status(job), pretty=False), status=202, mimetype='application/json')
+    return Response(json_dumper(job.result, pretty=False), status=job.result_status, mimetype='application/json')
+
+
+def run_query_job(job: QueryJob) -> tuple:
+    """Runs a queued RAG query job.
+
+    Args:
+        job (QueryJob): The job.
+
+    Returns:
+        tuple: The HTTP status and payload of the response.
+    """
+    status, payload = answer_query(job.data, job.set_stage)
+    job.set_stage('complete')
+    return status, payload
+
+
+def answer_query(data: dict, report_stage=None, on_token=None) -> tuple:
+    """Answers a RAG query request from the response cache, or by running the query pipeline.
+
+    Answered responses are added to the cache. Every response is marked with
+    'cache_hit', and the cache lookup time is added to its timings.
+
+    Args:
+        data (dict): The request data.
+        report_stage (callable): Called with the name of each pipeline stage as it starts, if given.
+        on_token (callable): Called with the key of the (sub-)query and each answer chunk as the
+                  LLM generates it, if given.
+
+    Returns:
+        tuple: The HTTP status and payload of the response.
+    """
+    if response_cache is None:
+        return execute_query(data, report_stage, on_token).payload()
+
+    lookup_start = cur_timestamp()
+    cached_response = response_cache.get(data.get('query'), data.get('pipeline'))
+    lookup_time = time_since(lookup_start)
+    if cached_response is not None:
+        logger.info("Response cache hit for query: %s", data.get('query'))
+        cached_response.update({
+            'id': gen_uuid(),
+            'cached_response_id': cached_response['id'],
+            'cache_hit': True,
+            'timings': {
+                'response_cache_lookup_time': lookup_time,
+                'request_time': lookup_time
+            }
+        })
+        return 200, cached_response
+
+    status, payload = execute_query(data, report_stage, on_token).payload()
+    if status == 200 and payload.get('is_answer'):
+        response_cache.put(data.get('query'), data.get('pipeline'), payload)
+    payload['cache_hit'] = False
+    payload.setdefault('timings', {})['response_cache_lookup_time'] = lookup_time
+    return status, payload
+
+
+def execute_query(data: dict, report_stage=None, on_token=None) -> ApiResponse:
+    """Runs the RAG query pipeline for a request.
+
+    Args:
+        data (dict): The request data.
+        report_stage (callable): Called with the name of each pipeline stage as it starts, if given.
+        on_token (callable): Called with the key of the (sub-)query and each answer chunk as the
+                  LLM generates it, if given. The time to the first chunk is recorded as
+                  'time_to_first_token'.
+
+    Returns:
+        ApiResponse: The response.
+    """
+    global stacks, qa_stacks, llm, chains, prefix_cache
+
+    if report_stage is None:
+        report_stage = lambda stage: None
+
     query_value = data.get('query')
     pipeline = data.get('pipeline')
 
-    if not gpu_exclusive:
-        timings.reset_timing()
-    else:
-        timings.reset_timing(
-            keep_ids=[
-                'qa_stacks_build_time',
-                'rag_stack_build_time',
-                'llm_model_load_time',
-                'chain_build_time',
-            ]
-        )
+    # Each request has its own timings, as the job worker and stream threads query concurrently.
+    request_timings = TimingManager()
+    if gpu_exclusive:
+        startup_timings = timings.get_timings()
+        for timing_id in ['qa_stacks_build_time', 'rag_stack_build_time', 'llm_model_load_time', 'chain_build_time']:
+            if timing_id in startup_timings:
+                request_timings.record(timing_id, startup_timings[timing_id])
 
     # Inits
     response = ApiResponse.new(
         query=query_value,
         pipeline=pipeline,
         exclusive_mode=gpu_exclusive,
-        timings=timings,
+        timings=request_timings,
         logger=logger
     )
     response.start_timing(['request_time'])
 
+    stream_token = None
+    first_token_sent = False
+    if on_token is not None:
+        response.start_timing(['time_to_first_token'])
+
+        def stream_token(query_key, text):
+            nonlocal first_token_sent
+            if not first_token_sent:
+                response.finalize_timing(['time_to_first_token'])
+                first_token_sent = True
+            on_token(query_key, text)
+
     response_was_summarized = False
     query_lock_type = get_query_lock_type()
     logger.info(f"Waiting for {query_lock_type} lock...")
     response.start_timing(['query_lock_wait_time'])
+    report_stage('waiting_for_lock')
 
     with get_query_lock():
         response.finalize_timing(['query_lock_wait_time'])
         logger.info(f"{query_lock_type} lock acquired.")
 
         if not gpu_exclusive:
+            report_stage('loading_models')
+            close_stacks(qa_stacks)
+            close_stacks(stacks)
             with response.time_block('qa_stacks_build_time'):
-                qa_stacks = build_qa_stacks(logger, response.timings)
+                qa_stacks = build_qa_stacks(logger)
 
             with response.time_block('rag_stack_build_time'):
                 stacks = build_rag_stacks(logger)
@@ -142,7 +321,11 @@ def libpages_query():
 
             with response.time_block('Chain_build_time'):
                 logger.info("Building Query Chains...")
-                chains = build_llm_chains(llm)
+                prefix_cache = get_prefix_cache(llm, logger)
+                chains = build_llm_chains(llm, prefix_cache)
+
+        if prefix_cache is not None:
+            prefix_cache.reset_stats()
 
         stack = stacks[pipeline]
         qa_stack = qa_stacks[pipeline]
@@ -153,6 +336,7 @@ def libpages_query():
 
         # QA Search, Avoid RAG Stack if Possible
         if qa_stack.has_questions():
+            report_stage('qa_search')
             with response.time_block('qa_query_time'):
                 qa_response, source_urls = query_qa_stack(qa_stack, query_value, chains, logger)
             response.update({'qa_response': qa_response, 'qa_response_metadata': qa_response['metadata']})
@@ -181,12 +365,23 @@ def libpages_query():
             response.update({'qa_response_used': False})
 
         if not qa_answered:
-            # Malicious Classification
-            with response.time_block('malicious_query_classification_time'):
-                logger.info("Classifying Maliciousness...")
-                malicious_classifier = MaliciousClassifier(query_value, chains['malicious'], logger)
-                classification, reason, classification_data = malicious_classifier.question_has_malicious_intent()
+            preflight_compounds = None
+            if preflight_classifier == 'combined':
+                # Malicious Classification and Compound Query Extraction, in one call
+                report_stage('preflight_classification')
+                with response.time_block('preflight_classification_time'):
+                    logger.info("Classifying Maliciousness and Compound Query...")
+                    preflight = PreflightClassifier(query_value, chains['preflight'], logger)
+                    classification, reason, classification_data, *preflight_compounds = preflight.classify()
+            else:
+                # Malicious Classification
+                report_stage('malicious_classification')
+                with response.time_block('malicious_query_classification_time'):
+                    logger.info("Classifying Maliciousness...")
+                    malicious_classifier = MaliciousClassifier(query_value, chains['malicious'], logger)
+                    classification, reason, classification_data = malicious_classifier.question_has_malicious_intent()
             response.update({
+                'preflight_classifier': preflight_classifier,
                 'malicious_query_classification': classification,
                 'malicious_query_classification_reason': reason,
                 'malicious_query_classification_response': classification_data
@@ -208,10 +403,14 @@ def libpages_query():
                     llm_query = LLMQuery(response.response['id'], stack, pipeline, data.get('client'), get_api_llm_config(), logger)
 
                 # Compound Query Extraction
-                with response.time_block('compound_query_classification_time'):
-                    logger.info("Classifying Compound Query...")
-                    compound_classifier = CompoundClassifier(query_value, chains['compound'], logger)
-                    classified_compounds, classifier_response, reason = compound_classifier.explode_query()
+                if preflight_compounds is not None:
+                    classified_compounds, classifier_response, reason = preflight_compounds
+                else:
+                    report_stage('compound_classification')
+                    with response.time_block('compound_query_classification_time'):
+                        logger.info("Classifying Compound Query...")
+                        compound_classifier = CompoundClassifier(query_value, chains['compound'], logger)
+                        classified_compounds, classifier_response, reason = compound_classifier.explode_query()
 
                 if not classified_compounds or 'queries' not in classified_compounds or not classified_compounds['queries']:
                     logger.info("Compound Classification Failed...")
@@ -234,12 +433,19 @@ def libpages_query():
 
                 # Iterate through all queries to infer
                 with response.compound_time_block('llm_query_time'):
-                    for query_value in queries_to_infer.values():
+                    for query_key, query_value in queries_to_infer.items():
                         constructed_query = construct_given_that_query(llm_inferences, query_value)
 
                         # Query LLM
+                        report_stage('llm_query')
                         logger.info("Querying LLM...")
-                        llm_response = llm_query.query(constructed_query, chains['chain-context-only'])
+                        llm_response = llm_query.query(
+                            constructed_query,
+                            chains['chain-context-only'],
+                            None if stream_token is None else lambda text: stream_token(query_key, text),
+                            report_stage,
+                            response.timings
+                        )
                         response.update(llm_response)
 
                         # Response Validity
@@ -258,12 +464,14 @@ def libpages_query():
                         })
                         response.timings.increment_compound_timing('llm_query_time')
 
+            report_stage('summarizing')
             with response.time_block('summarizer_query_time'):
                 response_summarizer = CompoundResponseSummarizer(chains['summarizer'], logger)
                 final_response, response_was_summarized, has_valid_answers = response_summarizer.summarize(llm_inferences)
                 response.update({'source_urls': []})
 
             if has_valid_answers:
+                report_stage('source_extraction')
                 with response.time_block('sources_query_time'):
                     chunks_used = []
                     for inference in llm_inferences:
@@ -283,20 +491,27 @@ def libpages_query():
                 'inference_results': list_of_dicts_to_dict(llm_inferences)
             })
 
+        if prefix_cache is not None:
+            for timing_id, value in prefix_cache.get_stats().items():
+                response.timings.record(timing_id, value)
+
     response.update({
         'qa_answered': qa_answered,
         'query_lock_type': query_lock_type,
         'response_was_summarized': response_was_summarized,
     })
 
+    if on_token is not None and not first_token_sent:
+        response.reset_timing(['time_to_first_token'])
+
     response.finalize_timing(['request_time'])
-    return response.render()
+    return response
 
 
 @app.route("/search", methods=['POST'])
 def db_search_query():
     """Search RAG embeddings. Not logged or for general use."""
-    global stacks, llm, chains, timings
+    global stacks, llm, chains, prefix_cache, timings
 
     data = request.json
     query_value = data.get('query')
@@ -311,6 +526,7 @@ def db_search_query():
         logger.info(f"{query_lock_type}.")
 
         if not gpu_exclusive:
+            close_stacks(stacks)
             logger.info("Building Query Stacks...")
             stacks = build_rag_stacks(logger)            
 
@@ -329,7 +545,7 @@ def db_search_query():
 # API Start-up.
 def start() -> None:
     """Starts the API server."""
-    global stacks, qa_stacks, llm, chains, timings
+    global stacks, qa_stacks, llm, chains, prefix_cache, timings
     report_memory_use(logger)
     logger.info("Starting API server...")
 
@@ -357,7 +573,8 @@ def start() -> None:
         with timings.time_block('chain_build_time'):
             # @TODO: Move to inference 'provider'.
             logger.info("Building Query Chains...")
-            chains = build_llm_chains(llm)
+            prefix_cache = get_prefix_cache(llm, logger)
+            chains = build_llm_chains(llm, prefix_cache)
 
     try:
         waitress_serve(app, host=get_api_host(), port=get_api_port())
@@ -413,6 +630,18 @@ def construct_given_that_query(history: list, new_query: str) -> str:
 
     return f"{context_intro}, {new_query}"  # Form the final structured query
 
+def format_sse_event(event: str, data: dict) -> str:
+    """Formats a server-sent event.
+
+    Args:
+        event (str): The event type.
+        data (dict): The event data.
+
+    Returns:
+        str: The event.
+    """
+    return f"event: {event}\ndata: {json_dumper(data, pretty=False)}\n\n"
+
 def get_query_lock():
     """Returns the appropriate lock based on the gpu_exclusive mode."""
     if gpu_exclusive:
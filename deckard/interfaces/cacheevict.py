@@ -0,0 +1,44 @@
+"""Provides a command to evict embeddings from the embedding cache."""
+import sys
+from logging import Logger
+
+from deckard.core import get_logger
+from deckard.core.config import get_embedding_cache_config
+from deckard.encoders import EmbeddingCache
+
+DECKARD_CMD_STRING = 'cache:evict'
+
+def start(args: list=sys.argv) -> None:
+    """Evicts the least recently used embeddings beyond a maximum count.
+
+    Args:
+        args (list, optional): The arguments for the command. Defaults to sys.argv.
+    """
+    log = get_logger()
+    max_entries = validate_args(args, log)
+
+    cache = EmbeddingCache(log, max_entries)
+    log.info("Embedding cache holds %s embeddings, keeping at most %s.", cache.count(), max_entries)
+    cache.evict(max_entries, vacuum=True)
+
+def validate_args(args: list, log: Logger) -> int:
+    """Validates the arguments for the command and exits if invalid.
+
+    Args:
+        args (list): The arguments to validate.
+        log (Logger): The logger to use.
+
+    Returns:
+        int: The maximum number of embeddings to keep.
+    """
+    if len(args) > 1:
+        if not args[1].isdigit():
+            log.warning("Usage: poetry run %s [max_entries]", DECKARD_CMD_STRING)
+            sys.exit(1)
+        return int(args[1])
+
+    max_entries = int(get_embedding_cache_config().get('max_entries', 0))
+    if not max_entries:
+        log.error("No max_entries argument given and no embedding_cache.max_entries configured.")
+        sys.exit(1)
+    return max_entries
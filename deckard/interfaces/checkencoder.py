@@ -0,0 +1,115 @@
+"""Provides a command to compare an ONNX encoder against its PyTorch encoder."""
+import sys
+import time
+from logging import Logger
+
+import numpy as np
+
+from deckard.core import get_rag_pipelines, get_rag_pipeline, get_logger, available_rag_pipelines_message, load_class
+from deckard.encoders import OnnxEncoder, SentenceTransformerEncoder
+
+DECKARD_CMD_STRING = 'check:encoder'
+DEFAULT_SAMPLE_SIZE = 256
+
+def start(args: list=sys.argv) -> None:
+    """Reports the cosine agreement and latency of the ONNX and PyTorch encoders of a pipeline.
+
+    Args:
+        args (list, optional): The arguments for the command. Defaults to sys.argv.
+    """
+    log = get_logger()
+    validate_args(args, log)
+    pipeline = get_rag_pipeline(args[1])
+    sample_size = int(args[2]) if len(args) > 2 else DEFAULT_SAMPLE_SIZE
+
+    encoder_config = dict(pipeline['rag']['embedding_encoder'])
+    context_database = load_class(
+        pipeline['rag']['context_database']['module_name'],
+        pipeline['rag']['context_database']['class_name'],
+        [
+            pipeline['rag']['context_database']['name'],
+            log,
+            False
+        ]
+    )
+    texts = context_database.sample_chunks(sample_size)
+    if not texts:
+        log.error("Pipeline %s has no chunks to compare with. Build it first.", args[1])
+        sys.exit(1)
+
+    batch_size = int(encoder_config.get('batch_size', SentenceTransformerEncoder.DEFAULT_BATCH_SIZE))
+    torch_encoder = SentenceTransformerEncoder(encoder_config['model'], log, encoder_config)
+    onnx_encoder = OnnxEncoder(encoder_config['model'], log, encoder_config)
+
+    torch_vectors, torch_time = time_encoder(torch_encoder, texts, batch_size)
+    onnx_vectors, onnx_time = time_encoder(onnx_encoder, texts, batch_size)
+
+    agreement = cosine_agreement(torch_vectors, onnx_vectors)
+    log.info("Compared %s chunks encoded with %s.", len(texts), encoder_config['model'])
+    log.info(
+        "Cosine agreement: mean %.6f, min %.6f",
+        float(agreement.mean()),
+        float(agreement.min())
+    )
+    log.info(
+        "PyTorch (%s): %.2fs, %.1f chunks/s",
+        torch_encoder.device,
+        torch_time,
+        len(texts) / torch_time
+    )
+    log.info(
+        "ONNX (%s%s): %.2fs, %.1f chunks/s, %.2fx",
+        onnx_encoder.device,
+        ', int8' if onnx_encoder.quantize else '',
+        onnx_time,
+        len(texts) / onnx_time,
+        torch_time / onnx_time
+    )
+
+def time_encoder(encoder: SentenceTransformerEncoder, texts: list, batch_size: int) -> tuple:
+    """Encodes texts after a warm-up call, timing the encoding.
+
+    Args:
+        encoder (SentenceTransformerEncoder): The encoder.
+        texts (list): The texts to encode.
+        batch_size (int): The number of texts to encode per model call.
+
+    Returns:
+        tuple: The encoded texts and the encoding time in seconds.
+    """
+    encoder.encode_batch(texts[:batch_size], batch_size)
+    start_time = time.time()
+    vectors = encoder.encode_batch(texts, batch_size)
+    return np.asarray(vectors, dtype=np.float32), time.time() - start_time
+
+def cosine_agreement(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Computes the row-wise cosine similarity of two sets of vectors.
+
+    Args:
+        a (np.ndarray): The first vectors.
+        b (np.ndarray): The second vectors.
+
+    Returns:
+        np.ndarray: The cosine similarity of each pair of rows.
+    """
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+def validate_args(args: list, log: Logger) -> None:
+    """Validates the arguments for the command and exits if invalid.
+
+    Args:
+        args (list): The arguments to validate.
+        log (Logger): The logger to use.
+    """
+    pipelines = get_rag_pipelines()
+    if len(args) < 2 or (len(args) > 2 and not args[2].isdigit()):
+        log.warning("Usage: poetry run %s <pipeline> [sample_size]", DECKARD_CMD_STRING)
+        log.info(available_rag_pipelines_message())
+        sys.exit(1)
+
+    if args[1] not in pipelines:
+        log.error("Pipeline %s not found", args[1])
+        log.info(available_rag_pipelines_message())
+        sys.exit(1)
@@ -7,6 +7,7 @@ from deckard.rag import RagBuilder
 from deckard.qa import QABuilder
 
 DECKARD_CMD_STRING = 'build:rag'
+INCREMENTAL_FLAG = '--incremental'
 
 def start(args: list=sys.argv) -> None:
     """Starts the RAG pipeline builder.
@@ -18,8 +19,10 @@ def start(args: list=sys.argv) -> None:
     validate_args(args, log)
     pipeline = get_rag_pipeline(args[1])
 
+    incremental = INCREMENTAL_FLAG in args[2:]
+
     log.info("Building RAG Pipeline %s", pipeline['name'])
-    builder = RagBuilder(pipeline['rag'], log)
+    builder = RagBuilder(pipeline['rag'], log, incremental)
     builder.build()
 
 def validate_args(args: list, log: Logger) -> None:
@@ -31,7 +34,7 @@ def validate_args(args: list, log: Logger) -> None:
     """
     pipelines = get_rag_pipelines()
     if len(args) < 2:
-        log.warning("Usage: poetry run %s <pipeline>", DECKARD_CMD_STRING)
+        log.warning("Usage: poetry run %s <pipeline> [%s]", DECKARD_CMD_STRING, INCREMENTAL_FLAG)
         log.info(available_rag_pipelines_message())
         sys.exit(1)
 
@@ -1 +1,2 @@
 from .qa_service import query_qa_stack, build_qa_stacks
+from .job_queue import JobQueue, QueryJob
@@ -0,0 +1,190 @@
+"""Provides a bounded, in-process queue of asynchronous API jobs."""
+import queue
+import threading
+from logging import Logger
+
+from deckard.core.time import cur_timestamp
+from deckard.core.utils import gen_uuid
+
+class QueryJob:
+    """A queued query and its progress.
+
+    Args:
+        data (dict): The request data of the query.
+
+    Attributes:
+        created (float): The time the job was submitted.
+        data (dict): The request data of the query.
+        error (str): The error that failed the job, if any.
+        finished (float): The time the job finished. None if not finished.
+        id (str): The job ID.
+        result (dict): The response payload. None if not finished.
+        result_status (int): The HTTP status of the response payload.
+        stage (str): The current pipeline stage.
+        started (float): The time the job started. None if not started.
+        status (str): The job status: queued, running, complete or failed.
+    """
+
+    def __init__(self, data: dict) -> None:
+        self.id = gen_uuid()
+        self.data = data
+        self.status = 'queued'
+        self.stage = None
+        self.created = cur_timestamp()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.result_status = None
+        self.error = None
+
+    def set_stage(self, stage: str) -> None:
+        """Records the pipeline stage the job has reached.
+
+        Args:
+            stage (str): The stage.
+        """
+        self.stage = stage
+
+    def is_finished(self) -> bool:
+        """Checks if the job has finished.
+
+        Returns:
+            bool: True if the job is complete or failed, False otherwise.
+        """
+        return self.status in ('complete', 'failed')
+
+
+class JobQueue:
+    """Runs queued query jobs one at a time on a single worker thread.
+
+    Args:
+        handler (callable): Runs a job, returning the HTTP status and payload of its response.
+        log (Logger): The logger for the queue.
+        max_queued (int): The maximum number of jobs waiting to run.
+        retention (int): The number of seconds finished jobs are kept.
+
+    Attributes:
+        handler (callable): Runs a job, returning the HTTP status and payload of its response.
+        jobs (dict): The jobs, keyed by job ID.
+        lock (threading.Lock): The lock guarding the jobs.
+        log (Logger): The logger for the queue.
+        pending (list): The IDs of the jobs waiting to run, in order.
+        queue (queue.Queue): The jobs waiting to run.
+        retention (int): The number of seconds finished jobs are kept.
+        worker (threading.Thread): The worker thread. None until started.
+    """
+
+    def __init__(self, handler, log: Logger, max_queued: int, retention: int) -> None:
+        self.handler = handler
+        self.log = log
+        self.retention = retention
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.jobs = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def start(self) -> None:
+        """Starts the worker thread, if it is not running."""
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name='query-job-worker', daemon=True)
+            self.worker.start()
+
+    def submit(self, data: dict) -> QueryJob:
+        """Queues a query job.
+
+        Args:
+            data (dict): The request data of the query.
+
+        Returns:
+            QueryJob: The job. None if the queue is full.
+        """
+        self.start()
+        self._purge_expired()
+        job = QueryJob(data)
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                return None
+            self.jobs[job.id] = job
+            self.pending.append(job.id)
+        self.log.info("Queued job %s, %s jobs waiting.", job.id, len(self.pending))
+        return job
+
+    def get(self, job_id: str) -> QueryJob:
+        """Gets a job.
+
+        Args:
+            job_id (str): The job ID.
+
+        Returns:
+            QueryJob: The job. None if it does not exist or has expired.
+        """
+        self._purge_expired()
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def position(self, job_id: str) -> int:
+        """Gets the position of a job in the queue.
+
+        Args:
+            job_id (str): The job ID.
+
+        Returns:
+            int: The number of jobs ahead of it, 0 if it is next. None if it is not waiting.
+        """
+        with self.lock:
+            if job_id in self.pending:
+                return self.pending.index(job_id)
+            return None
+
+    def status(self, job: QueryJob) -> dict:
+        """Describes the progress of a job.
+
+        Args:
+            job (QueryJob): The job.
+
+        Returns:
+            dict: The job status.
+        """
+        return {
+            'job_id': job.id,
+            'status': job.status,
+            'stage': job.stage,
+            'queue_position': self.position(job.id),
+            'created': job.created,
+            'started': job.started,
+            'finished': job.finished,
+            'error': job.error
+        }
+
+    def _work(self) -> None:
+        """Runs queued jobs, one at a time."""
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.pending.remove(job.id)
+            job.status = 'running'
+            job.started = cur_timestamp()
+            self.log.info("Running job %s", job.id)
+            try:
+                job.result_status, job.result = self.handler(job)
+                job.status = 'complete'
+            except Exception as e:
+                self.log.exception("Job %s failed", job.id)
+                job.error = str(e)
+                job.status = 'failed'
+            job.finished = cur_timestamp()
+            self.queue.task_done()
+
+    def _purge_expired(self) -> None:
+        """Removes the finished jobs older than the retention time."""
+        expire_before = cur_timestamp() - self.retention
+        with self.lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.is_finished() and job.finished < expire_before
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
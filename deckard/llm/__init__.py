@@ -1,7 +1,10 @@
 from .compound import CompoundClassifier, explode_query_prompt
 from .llm import LLM
 from .llm_query import LLMQuery
+from .tokenizer import LLMTokenizer
 from .malicious import MaliciousClassifier, malicious_classification_prompt
+from .prefix_cache import PrefixCache, get_prefix_cache
+from .preflight import PreflightClassifier, preflight_classification_prompt
 from .prompts import get_context_only_prompt, get_context_plus_prompt
 from .response_processor import ResponseProcessor
 from .response_verifier import ResponseVerifier, response_addresses_query_prompt
@@ -13,8 +13,18 @@ class CompoundClassifier:
         query (str): The query to process.
 
     Attributes:
+        JSON_SCHEMA (dict): The JSON schema of the sub-query response.
         query (dict): The query, broken down into sub-queries.
     """
+    JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'is_compound': {'type': 'boolean'},
+            'queries': {'type': 'object', 'additionalProperties': {'type': 'string'}}
+        },
+        'required': ['is_compound', 'queries']
+    }
+
     def __init__(self, query: str, chain: LLMChain, logger: Logger) -> None:
         self.query = query
         self.chain = chain
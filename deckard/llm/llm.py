@@ -52,19 +52,34 @@ class LLM:
     def _build_llama(self) -> LlamaCpp:
         """Builds the LlamaCpp from the model details.
 
+        The optional 'device' setting places the model: 'cpu' offloads no
+        layers, 'cuda:N' makes GPU N the main GPU, and 'cuda' or 'auto' use
+        n_gpu_layers as configured. 'n_threads' sets the CPU thread count.
+
         Returns:
             LlamaCpp: The LlamaCpp LLM.
         """
+        n_gpu_layers = self.config['n_gpu_layers']
+        model_kwargs = {}
+        device = str(self.config.get('device', 'cuda')).lower()
+        if device == 'cpu':
+            n_gpu_layers = 0
+        elif device.startswith('cuda:'):
+            model_kwargs['main_gpu'] = int(device.split(':')[1])
+        self.log.info("Loading LLM on %s with %s GPU layers.", device, n_gpu_layers)
+
         return LlamaCpp(
             model_path=self.model_filepath,
             max_tokens=self.config['max_response_tokens'],
             n_batch=self.config['n_batch'],
             n_ctx=self.config['n_ctx'],
-            n_gpu_layers=self.config['n_gpu_layers'],
+            n_gpu_layers=n_gpu_layers,
+            n_threads=self.config.get('n_threads'),
             repeat_penalty=self.config['repeat_penalty'],
             temperature=self.config['temperature'],
             top_k=self.config['top_k'],
             top_p=self.config['top_p'],
             min_p=self.config['min_p'],
+            model_kwargs=model_kwargs,
             verbose=self.config['verbose']
         )
@@ -3,6 +3,7 @@ from logging import Logger
 
 from langchain.chains import LLMChain
 
+from deckard.core.time import TimingManager
 from deckard.core.utils import gen_uuid, short_uuid
 from deckard.rag import RagStack
 from .response_processor import ResponseProcessor
@@ -59,19 +60,25 @@ class LLMQuery:
         self,
         query: str,
         chain: LLMChain,
+        on_token=None,
+        report_stage=None,
+        timings: TimingManager=None
     ) -> str:
         """ Queries the LLM chain.
 
         Args:
             query (str): The query to use.
             chain (LLMChain): The LLM chain to use.
+            on_token (callable): Called with each response chunk as the LLM generates it, if given.
+            report_stage (callable): Called with the name of each stack stage as it starts, if given.
+            timings (TimingManager): The timings to add the stack's stage times to, if given.
 
         Returns:
             str: The query response.
         """
         self.query_value = query
         self.log.info("New Query: %s [%s]: %s", query, self.pipeline_id, short_uuid(self.query_id))
-        stack_response = self.stack.query(query, chain, self.llm_config)
+        stack_response = self.stack.query(query, chain, self.llm_config, on_token, report_stage, timings)
 
         self.response_metadata.update(self.stack.get_response_metadata())
 
@@ -13,8 +13,18 @@ class MaliciousClassifier:
         response (str): The response to process.
 
     Attributes:
+        JSON_SCHEMA (dict): The JSON schema of the classification response.
         response (str): The response to process.
     """
+    JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'classification': {'type': 'string', 'enum': ['Safe', 'Potentially Malicious', 'Malicious']},
+            'reason': {'type': 'string'}
+        },
+        'required': ['classification', 'reason']
+    }
+
     def __init__(self, query: str, chain: LLMChain, logger: Logger) -> None:
         self.query = query
         self.chain = chain
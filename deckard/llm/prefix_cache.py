@@ -0,0 +1,269 @@
+"""Provides a cache of llama.cpp KV states for the static prefixes of chain prompts."""
+import ctypes
+import hashlib
+import os
+import threading
+from logging import Logger
+
+import llama_cpp
+import numpy as np
+from langchain_community.llms import LlamaCpp
+from langchain.prompts import PromptTemplate
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableLambda, RunnableSequence
+
+from deckard.core import get_data_dir
+from deckard.core.config import get_api_llm_config
+
+class PrefixCache:
+    """Restores each chain's evaluated prompt prefix into llama.cpp before the chain runs.
+
+    The chains share one model, and llama.cpp only reuses the evaluated tokens
+    of the previous prompt. As the chains alternate, each call re-evaluates its
+    whole instruction block. This cache saves the KV state after each chain's
+    static prefix (its template text up to the first variable) and restores it
+    before the chain's prompt is sent, leaving only the rest to evaluate.
+
+    Only the llama.cpp context state is saved, not the Python-side logits
+    buffer that Llama.save_state() copies, so each state is roughly the size
+    of the prefix's KV cache.
+
+    Args:
+        llm (LlamaCpp): The LLM shared by the chains.
+        log (Logger): The logger for the cache.
+        persist (bool): Whether to also keep the states on disk, for reuse after the model is reloaded.
+
+    Attributes:
+        DATA_PATH (str): The path to the persisted states.
+        SENTINEL (str): The placeholder used to find the end of a template's static prefix.
+        client (llama_cpp.Llama): The llama.cpp model.
+        hits (int): The number of prompts started from a restored prefix state.
+        lock (threading.Lock): The lock guarding the model state.
+        log (Logger): The logger for the cache.
+        misses (int): The number of prompts whose prefix had to be evaluated.
+        model_path (str): The path to the model file.
+        native_reuses (int): The number of prompts whose prefix llama.cpp still held, with no state restored.
+        persist (bool): Whether the states are kept on disk.
+        prefixes (dict): The static prefix tokens of each chain, keyed by chain name.
+        states (dict): The saved llama.cpp state of each chain's prefix, keyed by chain name.
+        tokens_saved (int): The number of prompt tokens not evaluated thanks to the cache.
+    """
+
+    DATA_PATH = os.path.join(
+        get_data_dir(),
+        'caches',
+        'llm_prefix'
+    )
+    SENTINEL = '\x00deckard-prefix\x00'
+
+    def __init__(self, llm: LlamaCpp, log: Logger, persist: bool=False) -> None:
+        self.client = llm.client
+        self.log = log
+        self.model_path = llm.model_path
+        self.persist = persist
+        self.lock = threading.Lock()
+        self.prefixes = {}
+        self.states = {}
+        self.reset_stats()
+
+    def wrap(self, name: str, prompt: PromptTemplate, llm: Runnable) -> RunnableSequence:
+        """Builds a chain that restores its cached prefix before querying the LLM.
+
+        The prompt and LLM stay the first and last steps of the sequence.
+
+        Args:
+            name (str): The chain name.
+            prompt (PromptTemplate): The chain's prompt.
+            llm (Runnable): The LLM, possibly bound to generation arguments.
+
+        Returns:
+            RunnableSequence: The chain.
+        """
+        sentinels = {variable: self.SENTINEL for variable in prompt.input_variables}
+        prefix = prompt.format(**sentinels).split(self.SENTINEL)[0]
+        # The last token of the prefix may merge with the text that follows it.
+        self.prefixes[name] = self._tokenize(prefix)[:-1]
+        return prompt | RunnableLambda(lambda value: self.restore(name, value)) | llm
+
+    def restore(self, name: str, prompt_value: PromptValue) -> PromptValue:
+        """Loads the cached prefix state of a chain into the model.
+
+        Args:
+            name (str): The chain name.
+            prompt_value (PromptValue): The formatted prompt.
+
+        Returns:
+            PromptValue: The formatted prompt, unchanged.
+        """
+        prefix = self.prefixes[name]
+        if not prefix or self._tokenize(prompt_value.to_string())[:len(prefix)] != prefix:
+            return prompt_value
+
+        with self.lock:
+            if self._model_has_prefix(prefix):
+                self.native_reuses += 1
+                return prompt_value
+
+            state = self.states.get(name)
+            if state is None:
+                state = self._read_state(prefix)
+            if state is not None and self._load_state(prefix, state):
+                self.states[name] = state
+                self._hit(prefix)
+                return prompt_value
+
+            self.states[name] = self._save_state(prefix)
+            self.misses += 1
+            self._write_state(prefix, self.states[name])
+        return prompt_value
+
+    def reset_stats(self) -> None:
+        """Resets the hit statistics."""
+        self.hits = 0
+        self.misses = 0
+        self.native_reuses = 0
+        self.tokens_saved = 0
+
+    def get_stats(self) -> dict:
+        """Gets the hit statistics since they were last reset.
+
+        Only restored states count as hits. Prompts whose prefix llama.cpp
+        still held are counted separately, as the cache did not save them.
+
+        Returns:
+            dict: The hit rate, the number of prompt tokens not evaluated thanks to
+                  restored states and the number of native prefix reuses.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'prefix_cache_hit_rate': self.hits / lookups if lookups else 0.0,
+            'prefix_cache_tokens_saved': self.tokens_saved,
+            'prefix_cache_native_reuses': self.native_reuses
+        }
+
+    def _hit(self, prefix: list) -> None:
+        """Counts a prompt started from a restored prefix state.
+
+        Args:
+            prefix (list): The prefix tokens.
+        """
+        self.hits += 1
+        self.tokens_saved += len(prefix)
+
+    def _tokenize(self, text: str) -> list:
+        """Tokenizes a prompt as llama.cpp does for a completion.
+
+        Args:
+            text (str): The prompt.
+
+        Returns:
+            list: The tokens.
+        """
+        return self.client.tokenize(text.encode('utf-8'), add_bos=True, special=True)
+
+    def _model_has_prefix(self, prefix: list) -> bool:
+        """Checks if the model's evaluated tokens already start with a prefix.
+
+        Args:
+            prefix (list): The prefix tokens.
+
+        Returns:
+            bool: True if the prefix is evaluated, False otherwise.
+        """
+        return (
+            self.client.n_tokens >= len(prefix)
+            and self.client.input_ids[:len(prefix)].tolist() == prefix
+        )
+
+    def _save_state(self, prefix: list) -> bytes:
+        """Evaluates a prefix from an empty context and saves the resulting state.
+
+        Args:
+            prefix (list): The prefix tokens.
+
+        Returns:
+            bytes: The llama.cpp context state.
+        """
+        self.client.reset()
+        self.client.eval(prefix)
+        size = llama_cpp.llama_state_get_size(self.client.ctx)
+        buffer = (ctypes.c_uint8 * size)()
+        copied = llama_cpp.llama_state_get_data(self.client.ctx, buffer, size)
+        return bytes(buffer)[:copied]
+
+    def _load_state(self, prefix: list, state: bytes) -> bool:
+        """Loads a saved prefix state into the model.
+
+        Args:
+            prefix (list): The prefix tokens.
+            state (bytes): The llama.cpp context state.
+
+        Returns:
+            bool: True if the state was loaded, False otherwise.
+        """
+        buffer = (ctypes.c_uint8 * len(state)).from_buffer_copy(state)
+        if llama_cpp.llama_state_set_data(self.client.ctx, buffer, len(state)) != len(state):
+            self.log.warning("Could not load cached LLM prefix state, evaluating it instead.")
+            return False
+        self.client.input_ids[:len(prefix)] = prefix
+        self.client.n_tokens = len(prefix)
+        return True
+
+    def _get_state_path(self, prefix: list) -> str:
+        """Gets the path of a persisted prefix state.
+
+        Args:
+            prefix (list): The prefix tokens.
+
+        Returns:
+            str: The path.
+        """
+        key = hashlib.md5(
+            f"{self.model_path}|{self.client.n_ctx()}|{llama_cpp.__version__}|{prefix}".encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.DATA_PATH, f'{key}.npy')
+
+    def _read_state(self, prefix: list) -> bytes:
+        """Reads a persisted prefix state, if persistence is enabled.
+
+        Args:
+            prefix (list): The prefix tokens.
+
+        Returns:
+            bytes: The llama.cpp context state. None if it is not persisted.
+        """
+        if not self.persist:
+            return None
+        filepath = self._get_state_path(prefix)
+        if not os.path.isfile(filepath):
+            return None
+        return np.load(filepath).tobytes()
+
+    def _write_state(self, prefix: list, state: bytes) -> None:
+        """Persists a prefix state, if persistence is enabled.
+
+        Args:
+            prefix (list): The prefix tokens.
+            state (bytes): The llama.cpp context state.
+        """
+        if not self.persist:
+            return
+        if not os.path.exists(self.DATA_PATH):
+            os.makedirs(self.DATA_PATH)
+        np.save(self._get_state_path(prefix), np.frombuffer(state, dtype=np.uint8))
+
+
+def get_prefix_cache(llm: LlamaCpp, log: Logger) -> PrefixCache:
+    """Gets a prefix cache for the LLM, if it is enabled in the configuration.
+
+    Args:
+        llm (LlamaCpp): The LLM.
+        log (Logger): The logger for the cache.
+
+    Returns:
+        PrefixCache: The prefix cache. None if it is disabled.
+    """
+    config = get_api_llm_config().get('prefix_cache') or {}
+    if not config.get('enabled', False):
+        return None
+    return PrefixCache(llm, log, config.get('persist', False))
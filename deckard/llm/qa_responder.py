@@ -11,7 +11,30 @@ class QAResponder:
     Args:
         chain (LLMChain): The LLM chain to use.
         logger (Logger): The logger
+
+    Attributes:
+        JSON_SCHEMA (dict): The JSON schema of the QA response.
     """
+    JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'match': {'type': 'boolean'},
+            'response': {'type': 'string'},
+            'links': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'text': {'type': 'string'},
+                        'url': {'type': 'string'}
+                    },
+                    'required': ['text', 'url']
+                }
+            }
+        },
+        'required': ['match']
+    }
+
     def __init__(self, chain: LLMChain, logger: Logger) -> None:
         self.chain = chain
         self.logger = logger
@@ -12,7 +12,18 @@ class ResponseSourceExtractor:
     Args:
         chain (LLMChain): The LLM chain to infer against.
         logger (Logger): The logger
+
+    Attributes:
+        JSON_SCHEMA (dict): The JSON schema of the sources response.
     """
+    JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'source_urls': {'type': 'array', 'items': {'type': 'string'}}
+        },
+        'required': ['source_urls']
+    }
+
     def __init__(self, chain: LLMChain, logger: Logger) -> None:
         self.chain = chain
         self.logger = logger
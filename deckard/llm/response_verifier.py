@@ -16,8 +16,18 @@ class ResponseVerifier:
         logger (Logger): The logger to use.
 
     Attributes:
+        JSON_SCHEMA (dict): The JSON schema of the verification response.
         response (str): The response to process.
     """
+    JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'is_answer': {'type': 'boolean'},
+            'reason': {'type': 'string'}
+        },
+        'required': ['is_answer', 'reason']
+    }
+
     def __init__(self, query: str, response: str, chain: LLMChain, logger: Logger) -> None:
         self.response = response
         self.query = query
@@ -0,0 +1,54 @@
+from logging import Logger
+
+from huggingface_hub import hf_hub_download
+from llama_cpp import Llama
+
+from .llm import LLM
+
+class LLMTokenizer:
+    """Counts tokens with the LLM's tokenizer, without loading the model weights.
+
+    Args:
+        log (Logger): The logger for the tokenizer.
+        config (dict): The configuration for the LLM.
+
+    Attributes:
+        log (Logger): The logger for the tokenizer.
+        vocab (Llama): The LLM, loaded with its vocabulary only.
+    """
+
+    def __init__(self, log: Logger, config: dict) -> None:
+        self.log = log
+        model_filepath = hf_hub_download(
+            repo_id=config['repo'],
+            filename=config['filename'],
+            cache_dir=LLM.HUGGINGFACE_MODEL_CACHE_PATH
+        )
+        log.info("Loading LLM Tokenizer: %s", config['filename'])
+        self.vocab = Llama(
+            model_path=model_filepath,
+            vocab_only=True,
+            verbose=False
+        )
+
+    def count(self, text: str) -> int:
+        """Counts the tokens of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return len(self.vocab.tokenize(text.encode('utf-8'), add_bos=False))
+
+    def count_many(self, texts: list) -> list:
+        """Counts the tokens of many texts.
+
+        Args:
+            texts (list): The texts.
+
+        Returns:
+            list: The number of tokens of each text.
+        """
+        return [self.count(text) for text in texts]
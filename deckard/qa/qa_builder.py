@@ -4,7 +4,9 @@ from logging import Logger
 from pydantic import ValidationError
 
 from deckard.core import load_class
+from deckard.core.index_version import bump_index_version
 from deckard.core.utils import gen_uuid
+from deckard.encoders import get_embedding_cache
 from deckard.qa.qa_validator import QAFile
 
 class QABuilder:
@@ -19,11 +21,11 @@ class QABuilder:
         self._load_questions_from_file()
 
     def build(self) -> None:
+        question_id = 0
         if self.config['qa']['database'] and self.config['qa']['questions']:
             self.qa_database.flush_data()
             self.log.info("Building QA items")
-            question_id = 0
-            is_first_question = True
+            questions = []
             for question in self.config['qa']['questions']:
                 for query in question.queries:
                     self.log.info("Processing question: %s", query)
@@ -34,15 +36,20 @@ class QABuilder:
                     for key, value in question.dict().items():
                         if key != 'queries':
                             question_data[key] = value
+                    questions.append(question_data)
 
-                    question_data['vector'] = self.qa_encoder.encode(query)
-                    self.qa_database.add_qa_question(
-                        question_data,
-                        is_first_question
-                    )
-                    if is_first_question:
-                        is_first_question = False
-                    question_id += 1
+            vectors = self.qa_encoder.encode_batch(
+                [question_data['question'] for question_data in questions]
+            )
+            for question_data, vector in zip(questions, vectors):
+                question_data['vector'] = vector
+            self.qa_database.add_qa_questions(questions, True)
+            question_id = len(questions)
+            bump_index_version(self.config['name'], 'qa', self.log)
+
+            if self.embedding_cache:
+                self.embedding_cache.report()
+                self.embedding_cache.enforce_limit()
         self.log.info("Processed %s questions.", question_id)
         self.log.info("QA Pipeline Processing Complete.")
 
@@ -65,9 +72,13 @@ class QABuilder:
                 self.config['qa']['encoder']['class_name'],
                 [
                     self.config['qa']['encoder']['model'],
-                    self.log
+                    self.log,
+                    self.config['qa']['encoder']
                 ]
             )
+            self.embedding_cache = get_embedding_cache(self.log)
+            if self.embedding_cache:
+                self.qa_encoder.use_cache(self.embedding_cache)
 
     def _load_questions_from_file(self) -> None:
         """Loads and validates questions from the external qa.yml file."""
@@ -3,6 +3,7 @@ from logging import Logger
 from pandas import DataFrame
 
 from deckard.core import load_class, make_json_safe
+from deckard.core.model_registry import acquire_model, release_model
 from deckard.llm import QAResponder
 
 class QAStack:
@@ -181,15 +182,20 @@ class QAStack:
         """
         return self.response_fail
 
+    def close(self) -> None:
+        """Releases the stack's models to the model registry."""
+        if self.qa_encoder is not None:
+            release_model(self.qa_encoder)
+        self.qa_encoder = None
+
     def _init_qa_pipeline_components(self) -> None:
         """Initializes the components for the RAG pipeline."""
-        self.qa_encoder = load_class(
+        self.qa_encoder = acquire_model(
             self.config['encoder']['module_name'],
             self.config['encoder']['class_name'],
-            [
-                self.config['encoder']['model'],
-                self.log
-            ]
+            self.config['encoder']['model'],
+            self.log,
+            self.config['encoder']
         )
         self.qa_database = load_class(
             self.config['database']['module_name'],
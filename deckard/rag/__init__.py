@@ -1,3 +1,4 @@
 from .rag_builder import RagBuilder
+from .rag_maintainer import RagMaintainer
 from .rag_stack import RagStack
 
@@ -0,0 +1,99 @@
+"""Provides a manifest of the documents indexed by a RAG pipeline build."""
+import hashlib
+import json
+import os
+from logging import Logger
+
+from deckard.core import get_data_dir, json_dumper
+from deckard.core.utils import open_file_read, open_file_write
+
+class BuildManifest:
+    """Tracks the source, content hash and document ID of every indexed document.
+
+    Args:
+        name (str): The name of the pipeline.
+        log (Logger): The logger for the manifest.
+
+    Attributes:
+        DATA_PATH (str): The path to the manifest directory.
+        documents (dict): The indexed documents, keyed by source. Each value
+                  has the following elements:
+                    - hash: The hash of the document's content.
+                    - doc_id: The document's ID in the pipeline databases.
+        filepath (str): The path to the manifest file.
+        fingerprint (str): The fingerprint of the configuration that built the documents.
+        log (Logger): The logger for the manifest.
+        next_embedding_id (int): The next free embedding id.
+    """
+
+    DATA_PATH = os.path.join(
+        get_data_dir(),
+        'manifests'
+    )
+
+    def __init__(self, name: str, log: Logger) -> None:
+        self.log = log
+        self.filepath = os.path.join(self.DATA_PATH, f'{name}.json')
+        self.documents = {}
+        self.fingerprint = None
+        self.next_embedding_id = 0
+        self.load()
+
+    def exists(self) -> bool:
+        """Checks if a previous build wrote the manifest.
+
+        Returns:
+            bool: True if the manifest file exists, False otherwise.
+        """
+        return os.path.isfile(self.filepath)
+
+    def load(self) -> None:
+        """Loads the manifest from disk, if it exists."""
+        if not self.exists():
+            return
+        with open_file_read(self.filepath) as f:
+            data = json.load(f)
+        self.documents = data.get('documents', {})
+        self.fingerprint = data.get('fingerprint')
+        self.next_embedding_id = data.get('next_embedding_id', 0)
+        self.log.info("Loaded build manifest with %s documents.", len(self.documents))
+
+    def save(self) -> None:
+        """Writes the manifest to disk."""
+        if not os.path.exists(self.DATA_PATH):
+            os.makedirs(self.DATA_PATH)
+        with open_file_write(self.filepath) as f:
+            f.write(
+                json_dumper(
+                    {
+                        'fingerprint': self.fingerprint,
+                        'next_embedding_id': self.next_embedding_id,
+                        'documents': self.documents
+                    }
+                )
+            )
+        self.log.info("Saved build manifest with %s documents.", len(self.documents))
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Hashes the content of a document.
+
+        Args:
+            content (str): The content to hash.
+
+        Returns:
+            str: The hash of the content.
+        """
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def fingerprint_config(config: dict) -> str:
+        """Fingerprints the parts of a configuration that shape the indexed data.
+
+        Args:
+            config (dict): The configuration to fingerprint.
+
+        Returns:
+            str: The fingerprint.
+        """
+        return hashlib.md5(json_dumper(config, sort_keys=True).encode('utf-8')).hexdigest()
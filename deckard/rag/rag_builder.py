@@ -1,8 +1,15 @@
+import json
 from logging import Logger
 
 from deckard.core import load_class
 from deckard.core.utils import clear_gpu_memory
 from deckard.core.utils import gen_uuid
+from deckard.core.config import get_api_llm_config
+from deckard.core.index_version import bump_index_version
+from deckard.encoders import get_embedding_cache
+from deckard.llm import LLMTokenizer
+
+from .build_manifest import BuildManifest
 
 class RagBuilder:
     """Builds the data for a RAG pipeline.
@@ -10,40 +17,89 @@ class RagBuilder:
     Args:
         config (dict): The pipeline configuration.
         log (Logger): The logger.
+        incremental (bool): Whether to only rebuild documents that changed since the last build.
 
     Attributes:
+        DEFAULT_BUFFER_BYTES (int): The default chunk text size, in bytes, that triggers a buffer write.
+        DEFAULT_BUFFER_ROWS (int): The default number of chunks that triggers a buffer write.
+        DEFAULT_ENCODE_BATCH_SIZE (int): The default number of chunks to encode per model call.
         config (dict): The configuration.
         log (Logger): The logger.
         database (EmbeddingDatabase): The database for the embeddings.
         context_database (ContextDatabase): The database for the contexts.
         encoder (EmbeddingEncoder): The encoder for the embeddings.
+        embedding_cache (EmbeddingCache): The persistent embedding cache, if enabled.
+        encode_batch_size (int): The number of chunks to encode per model call.
         chunker (Chunker): The chunker for the documents.
         collectors (list): The collectors for the documents.
+        buffer_max_bytes (int): The chunk text size, in bytes, that triggers a buffer write.
+        buffer_max_rows (int): The number of chunks that triggers a buffer write.
+        document_buffer (list): The chunked documents waiting to be written.
+        failed_doc_ids (set): The IDs of the documents a backend failed to write during the build.
+        incremental (bool): Whether to only rebuild documents that changed since the last build.
+        tokenizer (LLMTokenizer): The tokenizer counting each chunk's LLM tokens, if context.token_budget is set.
     """
+
+    DEFAULT_BUFFER_BYTES = 4 * 1024 * 1024
+    DEFAULT_BUFFER_ROWS = 1024
+    DEFAULT_ENCODE_BATCH_SIZE = 32
+
     def __init__(
         self,
         config: dict,
-        log: Logger
+        log: Logger,
+        incremental: bool=False
     ):
         self.log = log
         self.config = config
+        self.incremental = incremental
         self._init_rag_builder_components()
 
     def build(self) -> None:
-        """Builds the RAG pipeline."""
-        self.database.flush_data()
-        self.context_database.flush_data()
-        self.sparse_search.flush_data()
+        """Builds the RAG pipeline.
+
+        In incremental mode, only documents that are new or whose content changed
+        since the last build are chunked and encoded. Documents that changed or
+        are no longer collected are removed from the pipeline databases.
+
+        Raises:
+            RuntimeError: If the sparse search failed to index any documents.
+        """
+        clear_gpu_memory()
+        manifest = BuildManifest(self.config['name'], self.log)
+        fingerprint = BuildManifest.fingerprint_config(self._get_build_fingerprint_config())
+        incremental = self.incremental and manifest.exists() and manifest.fingerprint == fingerprint
+        if self.incremental and not incremental:
+            self.log.warning("No compatible build manifest found, performing a full build.")
+
+        if incremental:
+            self.log.info("Performing an incremental build.")
+            self.embedding_id = manifest.next_embedding_id
+            self.create_tables = False
+            previous_documents = manifest.documents
+        else:
+            self.database.flush_data()
+            self.context_database.flush_data()
+            self.sparse_search.flush_data()
+            self.embedding_id = 0
+            self.create_tables = True
+            previous_documents = {}
+
+        self._reset_document_buffer()
+        self.failed_doc_ids = set()
+        built_documents = {}
+        total_items = 0
+        processed_items = 0
+        unchanged_items = 0
+        skipped_items = 0
 
         for collector in self.collectors:
             self.log.info("Processing collector %s", collector.name())
-            first_item = True
-            embedding_id = 0
-            total_items = collector.len()
-            if total_items == 0:
+            collector_items = collector.len()
+            total_items += collector_items
+            if collector_items == 0:
                 self.log.warning("Collector provided no items to process.")
-                return
-            processed_items = 0
+                continue
             pipeline_id = 0
 
             for document_content, metadata in collector:
@@ -51,47 +107,192 @@ class RagBuilder:
 
                 if document_content is None:
                     self.log.warning("Item %s is None, skipping.", pipeline_id)
+                    # Keep the previous build's copy of a document that failed to collect.
+                    source = self._get_document_source(None, metadata)
+                    if source in previous_documents:
+                        built_documents[source] = previous_documents[source]
                     continue
                 if collector.ignore_item(document_content):
                     self.log.info("Ignoring item %s", document_content)
                     continue
-                self.log.info("Processing item %s of %s", pipeline_id, total_items)
+                self.log.info("Processing item %s of %s", pipeline_id, collector_items)
                 processed_items += 1
 
+                source = self._get_document_source(document_content, metadata)
+                if source in built_documents:
+                    self.log.info("Skipping duplicate source %s", source)
+                    continue
+
+                unchanged = isinstance(metadata, dict) and metadata.pop('unchanged', False)
+                if unchanged:
+                    unchanged_items += 1
+                content_hash = BuildManifest.hash_content(document_content)
+                previous_document = previous_documents.get(source)
+                if previous_document and (unchanged or previous_document['hash'] == content_hash):
+                    built_documents[source] = previous_document
+                    skipped_items += 1
+                    continue
+
                 document['chunks'], document['raw_chunks'], document['metadata'] = self.chunker.generate(
                     document_content,
                     metadata
                 )
+                if self.tokenizer:
+                    document['token_counts'] = self.tokenizer.count_many(document['raw_chunks'])
 
+                # Record documents without chunks too, so they are skipped while unchanged.
+                built_documents[source] = {
+                    'hash': content_hash,
+                    'doc_id': document['id']
+                }
                 if len(document['chunks']) > 0:
-                    document['embeddings'] = []
-                    for chunk in document['chunks']:
-                        clear_gpu_memory()
-                        document['embeddings'].append(self.encoder.encode(chunk))
-
-                    embedding_id = self.database.add_embeddings(
-                        document,
-                        embedding_id,
-                        first_item
-                    )
-
-                    self.context_database.add_contexts(
-                        document,
-                        first_item
-                    )
-
-                    self.sparse_search.index_document(
-                        document
-                    )
-
-                    if first_item:
-                        first_item = False
+                    self._buffer_document(document)
                     pipeline_id += 1
 
+        self._flush_document_buffer()
+
+        # Leave failed documents out of the manifest, so the next build retries them.
+        for source, built in list(built_documents.items()):
+            if built['doc_id'] in self.failed_doc_ids:
+                if source in previous_documents:
+                    built_documents[source] = previous_documents[source]
+                else:
+                    del built_documents[source]
+
+        built_doc_ids = {built['doc_id'] for built in built_documents.values()}
+        stale_doc_ids = [
+            previous['doc_id'] for previous in previous_documents.values()
+            if previous['doc_id'] not in built_doc_ids
+        ]
+        stale_doc_ids.extend(self.failed_doc_ids)
+        if stale_doc_ids:
+            self.log.info("Removing %s changed, removed or failed documents.", len(stale_doc_ids))
+            self.database.delete_documents(stale_doc_ids)
+            self.context_database.delete_documents(stale_doc_ids)
+            self.sparse_search.delete_documents(stale_doc_ids)
+        self.context_database.commit()
+        self.sparse_search.commit()
+        self.database.create_indexes()
+        self.database.optimize()
+
+        manifest.documents = built_documents
+        manifest.fingerprint = fingerprint
+        manifest.next_embedding_id = self.embedding_id
+        manifest.save()
+        bump_index_version(self.config['name'], 'rag', self.log)
+
+        if self.embedding_cache:
+            self.embedding_cache.report()
+            self.embedding_cache.enforce_limit()
+
         ignored_items = total_items - processed_items
         self.log.info("Processed %s items, ignored %s items.", processed_items, ignored_items)
+        self.log.info("%s items were unchanged since they were last collected.", unchanged_items)
+        self.log.info("%s items were already up to date and were not rebuilt.", skipped_items)
+        if self.failed_doc_ids:
+            raise RuntimeError(
+                f"Sparse search failed to index {len(self.failed_doc_ids)} documents, the build is incomplete."
+            )
         self.log.info("Pipeline Processing Complete.")
 
+    def _get_build_fingerprint_config(self) -> dict:
+        """Gets the configuration that shapes the indexed data.
+
+        A change to any of these values invalidates the previous build's documents.
+
+        Returns:
+            dict: The configuration.
+        """
+        fingerprint_config = {
+            'embedding_encoder': self.config['embedding_encoder']['model'],
+            'embedding_encoder_class': self.config['embedding_encoder']['class_name'],
+            'embedding_encoder_quantize': bool(self.config['embedding_encoder'].get('quantize', False)),
+            'chunker': self.config['chunker']
+        }
+        if self.tokenizer:
+            fingerprint_config['token_counts'] = True
+        return fingerprint_config
+
+    @staticmethod
+    def _get_document_source(document_content: str, metadata) -> str:
+        """Gets the source that identifies a document across builds.
+
+        Args:
+            document_content (str): The content of the document.
+            metadata (dict|str): The metadata of the document.
+
+        Returns:
+            str: The document source. Falls back to the content hash if the
+                 metadata has no source.
+        """
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except json.JSONDecodeError:
+                metadata = None
+        if isinstance(metadata, dict) and metadata.get('source'):
+            return metadata['source']
+        if document_content is None:
+            return None
+        return BuildManifest.hash_content(document_content)
+
+    def _buffer_document(self, document: dict) -> None:
+        """Adds a chunked document to the write buffer, flushing it once full.
+
+        Args:
+            document (dict): The chunked document.
+        """
+        self.document_buffer.append(document)
+        self.buffer_rows += len(document['chunks'])
+        self.buffer_bytes += sum(len(chunk.encode('utf-8')) for chunk in document['chunks'])
+        if self.buffer_rows >= self.buffer_max_rows or self.buffer_bytes >= self.buffer_max_bytes:
+            self._flush_document_buffer()
+
+    def _flush_document_buffer(self) -> None:
+        """Encodes the buffered documents and writes them to every backend at once."""
+        if not self.document_buffer:
+            return
+        self.log.info(
+            "Writing %s documents (%s chunks) to the pipeline databases.",
+            len(self.document_buffer),
+            self.buffer_rows
+        )
+
+        chunks = [chunk for document in self.document_buffer for chunk in document['chunks']]
+        embeddings = self.encoder.encode_batch(chunks, self.encode_batch_size)
+        offset = 0
+        for document in self.document_buffer:
+            document['embeddings'] = embeddings[offset:offset + len(document['chunks'])]
+            offset += len(document['chunks'])
+
+        self.embedding_id = self.database.add_embeddings_batch(
+            self.document_buffer,
+            self.embedding_id,
+            self.create_tables
+        )
+        self.context_database.add_contexts_batch(
+            self.document_buffer,
+            self.create_tables
+        )
+        sparse_errors = self.sparse_search.index_documents(
+            self.document_buffer
+        )
+        if sparse_errors:
+            self.log.error(
+                "Sparse search failed to index %s batches of %s buffered documents.",
+                len(sparse_errors),
+                len(self.document_buffer)
+            )
+            self.failed_doc_ids.update(document['id'] for document in self.document_buffer)
+        self.create_tables = False
+        self._reset_document_buffer()
+
+    def _reset_document_buffer(self) -> None:
+        """Empties the document write buffer."""
+        self.document_buffer = []
+        self.buffer_rows = 0
+        self.buffer_bytes = 0
+
     def _init_rag_builder_components(self) -> None:
         """Initializes the components for building the RAG pipeline."""
         self.encoder = load_class(
@@ -99,9 +300,23 @@ class RagBuilder:
             self.config['embedding_encoder']['class_name'],
             [
                 self.config['embedding_encoder']['model'],
-                self.log
+                self.log,
+                self.config['embedding_encoder']
             ]
         )
+        self.encode_batch_size = int(
+            self.config['embedding_encoder'].get('batch_size', self.DEFAULT_ENCODE_BATCH_SIZE)
+        )
+        self.embedding_cache = get_embedding_cache(self.log)
+        if self.embedding_cache:
+            self.encoder.use_cache(self.embedding_cache)
+
+        self.tokenizer = None
+        if (self.config.get('context') or {}).get('token_budget', False):
+            self.tokenizer = LLMTokenizer(self.log, get_api_llm_config())
+        build_config = self.config.get('build') or {}
+        self.buffer_max_rows = int(build_config.get('buffer_rows', self.DEFAULT_BUFFER_ROWS))
+        self.buffer_max_bytes = int(build_config.get('buffer_bytes', self.DEFAULT_BUFFER_BYTES))
 
         self.database = load_class(
             self.config['embedding_database']['module_name'],
@@ -109,7 +324,8 @@ class RagBuilder:
             [
                 self.config['embedding_database']['name'],
                 self.log,
-                True
+                True,
+                self.config['embedding_database']
             ]
         )
 
@@ -119,7 +335,8 @@ class RagBuilder:
             [
                 self.config['sparse_search']['uri'],
                 self.log,
-                True
+                True,
+                self.config['sparse_search']
             ]
         )
 
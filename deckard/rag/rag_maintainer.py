@@ -0,0 +1,109 @@
+import time
+from logging import Logger
+
+from deckard.core import load_class
+
+class RagMaintainer:
+    """Runs maintenance on the data stores of a RAG pipeline.
+
+    Args:
+        config (dict): The pipeline configuration.
+        log (Logger): The logger.
+
+    Attributes:
+        config (dict): The configuration.
+        log (Logger): The logger.
+        database (EmbeddingDatabase): The database for the embeddings.
+        context_database (ContextDatabase): The database for the contexts.
+        sparse_search (SparseSearch): The sparse search endpoint.
+        qa_database (EmbeddingDatabase): The database for the QA questions, if any.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        log: Logger
+    ):
+        self.log = log
+        self.config = config
+        self._init_rag_maintainer_components()
+
+    def maintain(self) -> None:
+        """Compacts the embedding tables, vacuums the context database and optimizes the sparse index."""
+        self._run_embedding_database("embedding database", self.database)
+        if self.qa_database:
+            self._run_embedding_database("QA database", self.qa_database)
+        self._run("context database", self.context_database.optimize)
+        self._run("sparse search index", self.sparse_search.optimize)
+        self.log.info("RAG Pipeline Maintenance Complete.")
+
+    def _run_embedding_database(self, label: str, database) -> None:
+        """Optimizes an embedding database, skipping it if its table was never built.
+
+        Args:
+            label (str): The name of the data store being maintained.
+            database (EmbeddingDatabase): The database.
+        """
+        if not database.table_exists():
+            self.log.warning("Skipping %s, its table does not exist. Has the pipeline been built?", label)
+            return
+        self._run(label, database.optimize)
+
+    def _run(self, label: str, task) -> None:
+        """Runs a maintenance task, logging its duration.
+
+        Args:
+            label (str): The name of the data store being maintained.
+            task (callable): The maintenance task.
+        """
+        self.log.info("Maintaining %s", label)
+        start_time = time.time()
+        task()
+        self.log.info("Maintained %s in %.2fs", label, time.time() - start_time)
+
+    def _init_rag_maintainer_components(self) -> None:
+        """Initializes the data stores of the RAG pipeline."""
+        self.database = load_class(
+            self.config['embedding_database']['module_name'],
+            self.config['embedding_database']['class_name'],
+            [
+                self.config['embedding_database']['name'],
+                self.log,
+                False,
+                self.config['embedding_database']
+            ]
+        )
+
+        self.context_database = load_class(
+            self.config['context_database']['module_name'],
+            self.config['context_database']['class_name'],
+            [
+                self.config['context_database']['name'],
+                self.log,
+                False
+            ]
+        )
+
+        self.sparse_search = load_class(
+            self.config['sparse_search']['module_name'],
+            self.config['sparse_search']['class_name'],
+            [
+                self.config['sparse_search']['uri'],
+                self.log,
+                False,
+                self.config['sparse_search']
+            ]
+        )
+
+        self.qa_database = None
+        qa_config = self.config.get('qa') or {}
+        if qa_config.get('database'):
+            self.qa_database = load_class(
+                qa_config['database']['module_name'],
+                qa_config['database']['class_name'],
+                [
+                    qa_config['database']['name'],
+                    self.log,
+                    False
+                ]
+            )
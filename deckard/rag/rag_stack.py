@@ -1,8 +1,13 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain.chains import LLMChain
 from logging import Logger
 from pandas import DataFrame
 
 from deckard.core import load_class
+from deckard.core.model_registry import acquire_model, release_model
+from deckard.core.time import TimingManager
 
 class RagStack:
     """Provides a class that intefaces with a RAG pipeline.
@@ -13,6 +18,11 @@ class RagStack:
 
     Attributes:
         NO_CONTEX_RESPONSE (str): The response for no context found.
+        DEFAULT_DENSE_TIMEOUT (int): The default time, in seconds, to wait for dense retrieval.
+        DEFAULT_SPARSE_TIMEOUT (int): The default time, in seconds, to wait for sparse retrieval.
+        RETRIEVAL_WORKERS (int): The number of retrieval threads. A timed-out branch keeps its thread
+                          until its current stage returns, so there is room for one per branch
+                          beside the next query's.
         chain (str): The chain for the query.
         config (dict): The configuration.
         context (str): The context for the query.
@@ -29,11 +39,19 @@ class RagStack:
         response (str): The response.
         response_fail (bool): The response fail flag.
         response_metadata (list): The response metadata.
+        dense_timeout (float): The time, in seconds, to wait for dense retrieval.
         reranker (Reranker): The reranker for the embeddings.
+        retrieval_executor (ThreadPoolExecutor): The executor running the retrieval branches.
+        sparse_timeout (float): The time, in seconds, to wait for sparse retrieval.
+        token_budget (bool): Whether the context is measured in LLM tokens and fills the LLM's remaining context window.
+        use_stored_vectors (bool): Whether to rerank with the embedding encoder and stored vectors.
     """
 
     NO_CONTEX_RESPONSE = "Sorry, this question doesn't seem to be answered within the information I was provided."
     MAX_CONTEXTS = 10
+    DEFAULT_DENSE_TIMEOUT = 30
+    DEFAULT_SPARSE_TIMEOUT = 5
+    RETRIEVAL_WORKERS = 4
 
     def __init__(
         self,
@@ -71,7 +89,10 @@ class RagStack:
         self,
         query: str,
         chain: LLMChain,
-        llm_config: dict
+        llm_config: dict,
+        on_token=None,
+        report_stage=None,
+        timings: TimingManager=None
     ) -> str:
         """Queries the RAG pipeline.
 
@@ -79,6 +100,9 @@ class RagStack:
             query (str): The query.
             chain (LLMChain): The chain for the query.
             llm_config (dict): The LLM configuration.
+            on_token (callable): Called with each response chunk as the LLM generates it, if given.
+            report_stage (callable): Called with 'generating' once the context is built, if given.
+            timings (TimingManager): The timings to add the retrieval times to, if given.
 
         Returns:
             str: The response.
@@ -91,36 +115,41 @@ class RagStack:
         self.query_processor.set_query(query)
         embedding_query = self.query_processor.get_embedding_search_query()
 
-        self.log.info("Generating embedding for query: %s (%s) [%s]", query, embedding_query, self.pipeline_id)
-        query_vector = self.encoder.encode(embedding_query)
-
-        # LLM
-        self.log.info("Querying Vector Database with embeddings: %s [%s] (Max Distance: %s)", query, self.pipeline_id, self.context_max_distance)
-        vec_results = self.database.query(
-            query_vector,
-            limit=self.config['reranker']['max_raw_results'],
-            max_distance=self.context_max_distance,
+        # Dense and sparse retrieval are independent, run them concurrently.
+        retrieval_start = time.time()
+        dense_cancelled = threading.Event()
+        dense_future = self.retrieval_executor.submit(self._dense_retrieval, query, embedding_query, dense_cancelled)
+        sparse_future = self.retrieval_executor.submit(self._sparse_retrieval, query, embedding_query)
+        reranked_results, dense_time = self._await_retrieval(
+            dense_future,
+            'dense',
+            retrieval_start,
+            self.dense_timeout,
+            dense_cancelled
         )
-        self.log.info("Vector Results: %s", vec_results)
-
-        self.log.info("Reranking Results: %s (%s) [%s]", query, embedding_query, self.pipeline_id)
-        reranked_results = self.reranker.rerank(embedding_query, vec_results)
-        # reranked_results = vec_results
-        self.log.info("Reranked Results: %s", reranked_results)
-
-
-        self.log.info("Querying Sparse Search for query: %s [%s]", query, self.pipeline_id)
-        sparse_results = self.sparse_search.search(embedding_query)
+        sparse_results, sparse_time = self._await_retrieval(
+            sparse_future,
+            'sparse',
+            retrieval_start,
+            self.sparse_timeout
+        )
+        if timings is not None:
+            timings.add('dense_retrieval_time', dense_time)
+            timings.add('sparse_retrieval_time', sparse_time)
+            timings.add('retrieval_time', time.time() - retrieval_start)
 
-        self.log.info("Sparse Search Results: %s [%s]", query, self.pipeline_id)
-        self.log.info("Sparse Search Results: %s", sparse_results)
+        context_size = self.context_size
+        if self.token_budget:
+            context_size = self._get_context_token_budget()
+            self.context_builder.use_token_budget(self.chain.last.get_num_tokens)
+            self.response_metadata.update({'context_token_budget': context_size})
 
         self.log.info("Generating context for query: %s [%s]", query, self.pipeline_id)
         self.context, context_metadata = self.context_builder.build_context(
             reranked_results,
             sparse_results,
             self.context_database,
-            self.context_size
+            context_size
         )
 
         self.response_metadata.update({'embedding_query': embedding_query})
@@ -135,11 +164,132 @@ class RagStack:
             self.log.info("No Context Found for query: %s, Responding with: %s", query, self.response)
             return self.response
 
+        if report_stage is not None:
+            report_stage('generating')
         self.log.info("Querying Chain for query: %s [%s]", query, self.pipeline_id)
-        self.query_chain()
+        self.query_chain(on_token)
 
         return self.response
 
+    def _get_context_token_budget(self) -> int:
+        """Gets the number of LLM tokens left for the context.
+
+        This is the LLM's context window, less the reserved response tokens
+        and the tokens of the chain's prompt template filled with the query.
+
+        Returns:
+            int: The number of tokens available for the context.
+        """
+        prompt = self.chain.first.format(context='', query=self.query_value)
+        template_tokens = self.chain.last.get_num_tokens(prompt)
+        budget = int(self.llm_config['n_ctx']) - int(self.llm_config['max_response_tokens']) - template_tokens
+        max_tokens = self.config['context'].get('max_tokens')
+        if max_tokens:
+            budget = min(budget, int(max_tokens))
+        return max(0, budget)
+
+    def _dense_retrieval(self, query: str, embedding_query: str, cancelled: threading.Event) -> tuple:
+        """Encodes the query, queries the vector database and reranks the results.
+
+        The stages already running cannot be interrupted, so a cancelled
+        branch stops before its next stage instead.
+
+        Args:
+            query (str): The query.
+            embedding_query (str): The query to embed.
+            cancelled (threading.Event): Set when the query stops waiting for the branch.
+
+        Returns:
+            tuple: The reranked results and the time taken, in seconds.
+        """
+        start_time = time.time()
+        self.log.info("Generating embedding for query: %s (%s) [%s]", query, embedding_query, self.pipeline_id)
+        query_vector = self.encoder.encode(embedding_query)
+        if cancelled.is_set():
+            return DataFrame(), time.time() - start_time
+
+        self.log.info("Querying Vector Database with embeddings: %s [%s] (Max Distance: %s)", query, self.pipeline_id, self.context_max_distance)
+        if self.use_stored_vectors:
+            vec_results, vec_vectors = self.database.query(
+                query_vector,
+                limit=self.config['reranker']['max_raw_results'],
+                max_distance=self.context_max_distance,
+                return_vectors=True
+            )
+        else:
+            vec_results = self.database.query(
+                query_vector,
+                limit=self.config['reranker']['max_raw_results'],
+                max_distance=self.context_max_distance,
+            )
+        self.log.info("Vector Results: %s", vec_results)
+        if cancelled.is_set():
+            return DataFrame(), time.time() - start_time
+
+        self.log.info("Reranking Results: %s (%s) [%s]", query, embedding_query, self.pipeline_id)
+        if self.use_stored_vectors:
+            reranked_results = self.reranker.rerank(
+                embedding_query,
+                vec_results,
+                vectors=vec_vectors,
+                query_vector=query_vector
+            )
+        else:
+            reranked_results = self.reranker.rerank(embedding_query, vec_results)
+        self.log.info("Reranked Results: %s", reranked_results)
+        return reranked_results, time.time() - start_time
+
+    def _sparse_retrieval(self, query: str, embedding_query: str) -> tuple:
+        """Queries the sparse search endpoint.
+
+        Args:
+            query (str): The query.
+            embedding_query (str): The query to search for.
+
+        Returns:
+            tuple: The sparse results and the time taken, in seconds.
+        """
+        start_time = time.time()
+        self.log.info("Querying Sparse Search for query: %s [%s]", query, self.pipeline_id)
+        sparse_results = self.sparse_search.search(embedding_query)
+        self.log.info("Sparse Search Results: %s [%s]", query, self.pipeline_id)
+        self.log.info("Sparse Search Results: %s", sparse_results)
+        return sparse_results, time.time() - start_time
+
+    def _await_retrieval(
+        self,
+        future: Future,
+        branch: str,
+        started: float,
+        timeout: float,
+        cancelled: threading.Event=None
+    ) -> tuple:
+        """Waits for a retrieval branch, degrading to no results if it fails or times out.
+
+        A timed-out branch is cancelled if it has not started, and otherwise
+        signalled to stop before its next stage.
+
+        Args:
+            future (Future): The retrieval branch.
+            branch (str): The name of the branch, for logging.
+            started (float): The time retrieval started.
+            timeout (float): The time, in seconds, to wait for the branch after retrieval started.
+            cancelled (threading.Event): The event signalling the branch to stop, if it supports one.
+
+        Returns:
+            tuple: The results and the time taken, in seconds. The time waited if the branch did not complete.
+        """
+        try:
+            return future.result(timeout=max(0, timeout - (time.time() - started)))
+        except FutureTimeoutError:
+            future.cancel()
+            if cancelled is not None:
+                cancelled.set()
+            self.log.warning("%s retrieval timed out after %ss [%s]", branch.capitalize(), timeout, self.pipeline_id)
+        except Exception as e:
+            self.log.error("%s retrieval failed [%s]: %s", branch.capitalize(), self.pipeline_id, e)
+        return DataFrame(), time.time() - started
+
     def search(self, query: str) -> DataFrame:
         """Searches the embeddings database.
 
@@ -170,15 +320,25 @@ class RagStack:
         self.response_metadata = {}
         self.llm_config = {}
 
-    def query_chain(self) -> None:
-        """Queries the LLM chain."""
-        chain_response = self.chain.invoke(
-            {
-                "context": self.context,
-                "query": self.query_value
-            }
-        )
-        self.response = chain_response
+    def query_chain(self, on_token=None) -> None:
+        """Queries the LLM chain.
+
+        Args:
+            on_token (callable): Called with each response chunk as the LLM generates it, if given.
+        """
+        chain_input = {
+            "context": self.context,
+            "query": self.query_value
+        }
+        if on_token is None:
+            self.response = self.chain.invoke(chain_input)
+            return
+
+        chunks = []
+        for chunk in self.chain.stream(chain_input):
+            chunks.append(chunk)
+            on_token(chunk)
+        self.response = ''.join(chunks)
 
     def get_response(self) -> str:
         """Returns the response.
@@ -204,31 +364,46 @@ class RagStack:
         """
         return self.response_fail
 
+    def close(self) -> None:
+        """Releases the stack's models to the model registry."""
+        if self.reranker is not None and self.reranker is not self.encoder:
+            release_model(self.reranker)
+        if self.encoder is not None:
+            release_model(self.encoder)
+        self.reranker = None
+        self.encoder = None
+        self.retrieval_executor.shutdown(wait=False)
+
     def _init_rag_pipeline_components(self) -> None:
         """Initializes the components for the RAG pipeline."""
-        self.encoder = load_class(
+        self.encoder = acquire_model(
             self.config['embedding_encoder']['module_name'],
             self.config['embedding_encoder']['class_name'],
-            [
-                self.config['embedding_encoder']['model'],
-                self.log
-            ]
+            self.config['embedding_encoder']['model'],
+            self.log,
+            self.config['embedding_encoder']
         )
-        self.reranker = load_class(
-            self.config['reranker']['module_name'],
-            self.config['reranker']['class_name'],
-            [
+        self.use_stored_vectors = self.config['reranker'].get('use_stored_vectors', False)
+        if self.use_stored_vectors:
+            # Rerank with the embedding encoder against the vectors stored at build time.
+            self.log.info("Reranking with stored embeddings, skipping reranker model load.")
+            self.reranker = self.encoder
+        else:
+            self.reranker = acquire_model(
+                self.config['reranker']['module_name'],
+                self.config['reranker']['class_name'],
                 self.config['reranker']['model'],
-                self.log
-            ]
-        )
+                self.log,
+                self.config['reranker']
+            )
         self.database = load_class(
             self.config['embedding_database']['module_name'],
             self.config['embedding_database']['class_name'],
             [
                 self.config['embedding_database']['name'],
                 self.log,
-                True
+                True,
+                self.config['embedding_database']
             ]
         )
         self.context_database = load_class(
@@ -237,7 +412,8 @@ class RagStack:
             [
                 self.config['context_database']['name'],
                 self.log,
-                True
+                True,
+                {**self.config['context_database'], 'pipeline': self.config['name']}
             ]
         )
 
@@ -247,7 +423,8 @@ class RagStack:
             [
                 self.config['sparse_search']['uri'],
                 self.log,
-                True
+                True,
+                self.config['sparse_search']
             ]
         )
 
@@ -255,7 +432,8 @@ class RagStack:
             self.config['context_builder']['module_name'],
             self.config['context_builder']['class_name'],
             [
-                self.log
+                self.log,
+                self.config['context_builder']
             ]
         )
 
@@ -268,5 +446,13 @@ class RagStack:
         )
 
         self.context_size = self.config['context']['size']
+        self.token_budget = self.config['context'].get('token_budget', False)
         self.context_max_distance = self.config['context']['max_vector_distance']
         self.pipeline_id = self.config['name']
+
+        self.dense_timeout = float(self.config['embedding_database'].get('timeout', self.DEFAULT_DENSE_TIMEOUT))
+        self.sparse_timeout = float(self.config['sparse_search'].get('timeout', self.DEFAULT_SPARSE_TIMEOUT))
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=self.RETRIEVAL_WORKERS,
+            thread_name_prefix=f"retrieval-{self.config['name']}"
+        )
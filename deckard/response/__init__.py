@@ -1 +1,2 @@
 from .api_response import ApiResponse
+from .response_cache import ResponseCache, get_response_cache
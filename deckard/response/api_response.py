@@ -24,14 +24,6 @@ class ApiResponse:
     def update(self, d):
         self.response.update(d)
 
-    def handle_error(self):
-        if 'error' in self.response:
-            self.logger.error("Error in LLM query:")
-            self.logger.error(self.response['error'])
-            self.response['is_answer'] = False
-            return Response(json_dumper(self.response, pretty=False), status=500, mimetype='application/json')
-        return None
-
     def process_response(self):
         """Post-processes the response if needed (RAG pipeline, etc)."""
         if self.response.get('is_answer') and self.response.get('qa_answered') != True:
@@ -45,19 +37,24 @@ class ApiResponse:
         return self.response
 
     def render(self):
-        error_response = self.handle_error()
-        if error_response:
-            return error_response
+        status, payload = self.payload()
+        return Response(json_dumper(payload, pretty=False), status=status, mimetype='application/json')
 
-        self.process_response()
-        self.response['timings'] = self.timings.get_timings() if self.timings else {}
+    def payload(self):
+        """Completes the response, returning its HTTP status and data."""
+        if 'error' in self.response:
+            self.logger.error("Error in LLM query:")
+            self.logger.error(self.response['error'])
+            self.response['is_answer'] = False
+            return 500, self.response
 
+        self.process_response()
         self.finalize()
         self.write_response_disk()
-        return Response(json_dumper(self.response, pretty=False), status=200, mimetype='application/json')
+        return 200, self.response
 
     def finalize(self):
-        self.response['timings'] = self.timings.get_timings() if self.timings else {}
+        self.response['timings'] = dict(self.timings.get_timings()) if self.timings else {}
 
     # @TODO - Hardcoded: Should be moved to config
     def write_response_disk(self) -> None:
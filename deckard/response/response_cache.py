@@ -0,0 +1,240 @@
+"""Provides a cache of final API responses."""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from logging import Logger
+
+from deckard.core import get_data_dir, json_dumper
+from deckard.core.config import get_api_llm_config, get_api_preflight_classifier, get_api_response_cache_config
+from deckard.core.index_version import get_index_version
+from deckard.core.time import cur_timestamp
+
+class ResponseCache:
+    """Caches final query responses, keyed by normalized query, pipeline, index version and LLM configuration.
+
+    Responses are held in a bounded, least recently used in-memory cache and,
+    optionally, a SQLite table that outlives the API process. Entries expire
+    after a time to live. When a rebuild bumps a pipeline's index version, the
+    pipeline's entries are dropped.
+
+    Args:
+        log (Logger): The logger for the cache.
+        llm_config (dict): The configuration that shapes the LLM's responses.
+        max_entries (int): The maximum number of cached responses.
+        ttl (int): The number of seconds a response is cached for.
+        persist (bool): Whether to also keep the responses on disk.
+
+    Attributes:
+        CACHE_TABLE_NAME (str): The name of the table for the responses.
+        DATA_PATH (str): The path to the cache directory.
+        DATABASE_FILENAME (str): The filename of the cache database.
+        connection (sqlite3.Connection): The connection to the cache database. None if not persisted.
+        entries (OrderedDict): The in-memory pipeline, creation time and response of each
+                 cache key, least recently used first.
+        index_versions (dict): The last seen index version of each pipeline.
+        llm_fingerprint (str): The fingerprint of the LLM configuration.
+        lock (threading.Lock): The lock guarding the cache.
+        log (Logger): The logger for the cache.
+        max_entries (int): The maximum number of cached responses.
+        ttl (int): The number of seconds a response is cached for.
+    """
+
+    CACHE_TABLE_NAME = "responses"
+    DATA_PATH = os.path.join(
+        get_data_dir(),
+        'caches'
+    )
+    DATABASE_FILENAME = 'responses.sqlite'
+
+    def __init__(self, log: Logger, llm_config: dict, max_entries: int=1000, ttl: int=86400, persist: bool=False) -> None:
+        self.log = log
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.llm_fingerprint = hashlib.md5(json_dumper(llm_config, sort_keys=True).encode('utf-8')).hexdigest()
+        self.entries = OrderedDict()
+        self.index_versions = {}
+        self.lock = threading.Lock()
+        self.connection = None
+        if persist:
+            if not os.path.exists(self.DATA_PATH):
+                os.makedirs(self.DATA_PATH)
+            self.connection = sqlite3.connect(
+                os.path.join(self.DATA_PATH, self.DATABASE_FILENAME),
+                check_same_thread=False
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.CACHE_TABLE_NAME} ("
+                "cache_key TEXT PRIMARY KEY, pipeline TEXT, index_version TEXT, created REAL, response TEXT)"
+            )
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.CACHE_TABLE_NAME}_created "
+                f"ON {self.CACHE_TABLE_NAME} (created)"
+            )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalizes a query, so trivially different phrasings share a cache entry.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            str: The normalized query.
+        """
+        normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', query or '')).strip().casefold()
+        return normalized.rstrip(' ?!.')
+
+    def get(self, query: str, pipeline: str) -> dict:
+        """Gets the cached response to a query.
+
+        Args:
+            query (str): The query.
+            pipeline (str): The pipeline queried.
+
+        Returns:
+            dict: The cached response. None if it is not cached or has expired.
+        """
+        expire_before = cur_timestamp() - self.ttl
+        with self.lock:
+            cache_key, _ = self._get_key(query, pipeline)
+            entry = self.entries.get(cache_key)
+            if entry is not None:
+                _, created, response = entry
+                if created < expire_before:
+                    del self.entries[cache_key]
+                    return None
+                self.entries.move_to_end(cache_key)
+                return json.loads(response)
+            if self.connection is None:
+                return None
+            row = self.connection.execute(
+                f"SELECT created, response FROM {self.CACHE_TABLE_NAME} WHERE cache_key = ? AND created >= ?",
+                [cache_key, expire_before]
+            ).fetchone()
+            if row is None:
+                return None
+            self._add_entry(cache_key, pipeline, row[0], row[1])
+            return json.loads(row[1])
+
+    def put(self, query: str, pipeline: str, response: dict) -> None:
+        """Caches the response to a query.
+
+        Args:
+            query (str): The query.
+            pipeline (str): The pipeline queried.
+            response (dict): The response.
+        """
+        created = cur_timestamp()
+        serialized = json_dumper(response, pretty=False)
+        with self.lock:
+            cache_key, index_version = self._get_key(query, pipeline)
+            self._add_entry(cache_key, pipeline, created, serialized)
+            if self.connection is None:
+                return
+            with self.connection:
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO {self.CACHE_TABLE_NAME} VALUES (?,?,?,?,?)",
+                    [cache_key, pipeline, index_version, created, serialized]
+                )
+                self.connection.execute(
+                    f"DELETE FROM {self.CACHE_TABLE_NAME} WHERE created < ? OR cache_key IN ("
+                    f"SELECT cache_key FROM {self.CACHE_TABLE_NAME} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    [created - self.ttl, self.max_entries]
+                )
+
+    def invalidate(self, pipeline: str, keep_version: str=None) -> None:
+        """Drops the cached responses of a pipeline.
+
+        Args:
+            pipeline (str): The pipeline.
+            keep_version (str): An index version whose responses are kept, if any.
+        """
+        with self.lock:
+            self._invalidate_locked(pipeline, keep_version)
+
+    def _invalidate_locked(self, pipeline: str, keep_version: str=None) -> None:
+        """Drops the cached responses of a pipeline. The caller must hold the lock.
+
+        Args:
+            pipeline (str): The pipeline.
+            keep_version (str): An index version whose responses are kept, if any.
+        """
+        for cache_key in [key for key, entry in self.entries.items() if entry[0] == pipeline]:
+            del self.entries[cache_key]
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    f"DELETE FROM {self.CACHE_TABLE_NAME} WHERE pipeline = ? AND index_version != ?",
+                    [pipeline, keep_version or '']
+                )
+        self.log.info("Invalidated cached responses of pipeline %s.", pipeline)
+
+    def _get_key(self, query: str, pipeline: str) -> tuple:
+        """Gets the cache key of a query, invalidating the pipeline's entries if its index version changed.
+
+        The caller must hold the lock, so the version check, invalidation and
+        update are not interleaved with another request's.
+
+        Args:
+            query (str): The query.
+            pipeline (str): The pipeline queried.
+
+        Returns:
+            tuple: The cache key and the pipeline's index version.
+        """
+        index_version = get_index_version(pipeline)
+        if self.index_versions.get(pipeline) != index_version:
+            self._invalidate_locked(pipeline, index_version)
+            self.index_versions[pipeline] = index_version
+        cache_key = hashlib.sha256(
+            json_dumper(
+                [self.normalize_query(query), pipeline, index_version, self.llm_fingerprint],
+                pretty=False
+            ).encode('utf-8')
+        ).hexdigest()
+        return cache_key, index_version
+
+    def _add_entry(self, cache_key: str, pipeline: str, created: float, response: str) -> None:
+        """Adds a response to the in-memory cache, evicting the least recently used beyond the maximum.
+
+        Args:
+            cache_key (str): The cache key.
+            pipeline (str): The pipeline queried.
+            created (float): The time the response was cached.
+            response (str): The serialized response.
+        """
+        self.entries[cache_key] = (pipeline, created, response)
+        self.entries.move_to_end(cache_key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def get_response_cache(log: Logger) -> ResponseCache:
+    """Gets the response cache, if it is enabled in the configuration.
+
+    Args:
+        log (Logger): The logger for the cache.
+
+    Returns:
+        ResponseCache: The response cache. None if it is disabled.
+    """
+    config = get_api_response_cache_config()
+    if not config.get('enabled', False):
+        return None
+    llm_config = {
+        'model': get_api_llm_config(),
+        'preflight_classifier': get_api_preflight_classifier()
+    }
+    return ResponseCache(
+        log,
+        llm_config,
+        int(config.get('max_entries', 1000)),
+        int(config.get('ttl_seconds', 86400)),
+        config.get('persist', False)
+    )
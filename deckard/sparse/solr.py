@@ -20,23 +20,37 @@ class Solr(SparseSearch):
         uri (str): The full URI to the core. For example, http://localhost:8983/solr/deckard.
         log (Logger): The logger for the database.
         create_if_not_exists (bool): Whether to create the database if it does not exist.
+        config (dict): The sparse search configuration, if any.
 
     Attributes:
-        CONTEXT_TABLE_NAME (str): The name of the table for the context.
-        DATA_PATH (str): The path to the data directory.
+        client (SolrClient): The client for searching the core.
+        indexer (SolrIndexer): The indexer for updating the core.
         log (Logger): The logger for the database.
-        connection (sqlite3.Connection): The connection to the database.
+        session (requests.Session): The pooled HTTP session shared by the client and indexer.
     """
 
     def __init__(self,
             uri: str,
             log: Logger,
-            create_if_not_exists: bool=False
+            create_if_not_exists: bool=False,
+            config: dict=None
         ) -> None:
         self.log = log
+        config = config or {}
         self.log.info(f"Connecting to Solr: {uri}")
-        self.indexer = SolrIndexer(solr_url=uri)
-        self.client = SolrClient(solr_url=uri)
+        self.session = requests.Session()
+        self.indexer = SolrIndexer(
+            solr_url=uri,
+            session=self.session,
+            log=log,
+            batch_size=int(config.get('batch_size', SolrIndexer.DEFAULT_BATCH_SIZE)),
+            commit_within=config.get('commit_within')
+        )
+        self.client = SolrClient(
+            solr_url=uri,
+            session=self.session,
+            timeout=config.get('timeout')
+        )
 
         # Check if the Solr core is accessible
         if not self.client.test_connection():
@@ -52,51 +66,181 @@ class Solr(SparseSearch):
     def index_document(self, document):
         self.indexer.index_document(document, commit=True)
 
+    def index_documents(self, documents):
+        """Indexes many documents without committing. Call commit() once indexing is done.
+
+        Returns a list of the errors reported by failed batches.
+        """
+        return self.indexer.index_documents(documents, commit=False)
+
+    def delete_documents(self, doc_ids):
+        """Deletes many documents without committing. Call commit() once indexing is done."""
+        self.indexer.delete_documents(doc_ids, commit=False)
+
+    def commit(self):
+        self.indexer.commit()
+
+    def optimize(self):
+        self.indexer.optimize()
+
 class SolrIndexer:
-    def __init__(self, solr_url="http://localhost:8983/solr/my_core"):
+    """Indexes chunk documents into Solr in bulk over a pooled session.
+
+    Args:
+        solr_url (str): The full URI to the core.
+        session (requests.Session): The HTTP session to send requests with.
+        log (Logger): The logger for the indexer.
+        batch_size (int): The number of chunk documents to send per update request.
+        commit_within (int): If set, asks Solr to commit updates within this many milliseconds.
+
+    Attributes:
+        DEFAULT_BATCH_SIZE (int): The default number of chunk documents per update request.
+        DELETE_BATCH_SIZE (int): The number of document IDs per delete request.
+        OPTIMIZE_TIMEOUT (int): The timeout, in seconds, for optimize requests.
+        UPDATE_TIMEOUT (int): The timeout, in seconds, for update requests.
+    """
+
+    DEFAULT_BATCH_SIZE = 500
+    DELETE_BATCH_SIZE = 500
+    OPTIMIZE_TIMEOUT = 1800
+    UPDATE_TIMEOUT = 120
+
+    def __init__(self,
+            solr_url="http://localhost:8983/solr/my_core",
+            session=None,
+            log=None,
+            batch_size=DEFAULT_BATCH_SIZE,
+            commit_within=None
+        ):
         self.solr_url = solr_url
+        self.session = session or requests.Session()
+        self.log = log
+        self.batch_size = batch_size
+        self.commit_within = commit_within
 
     def index_document(self, document, commit=True):
         """Indexes a document into solr."""
+        return self.index_documents([document], commit)
 
-        for idx, chunk in enumerate(document['raw_chunks']):
-            doc = {
-                "id": str(uuid.uuid4()),
-                "document_id": document['id'],
-                "chunk_id": idx,
-                "document": chunk,
-                "metadata": json.dumps(document['metadata'])
-            }
-            response = requests.post(f"{self.solr_url}/update", json=[doc])
+    def index_documents(self, documents, commit=True):
+        """Indexes the chunks of many documents into solr, batch_size chunks per update request.
+
+        Returns a list of the errors reported by failed batches.
+        """
+        docs = []
+        for document in documents:
+            for idx, chunk in enumerate(document['raw_chunks']):
+                docs.append({
+                    "id": str(uuid.uuid4()),
+                    "document_id": document['id'],
+                    "chunk_id": idx,
+                    "document": chunk,
+                    "metadata": json.dumps(document['metadata'])
+                })
+
+        params = {}
+        if self.commit_within:
+            params['commitWithin'] = int(self.commit_within)
+
+        errors = []
+        for start in range(0, len(docs), self.batch_size):
+            batch = docs[start:start + self.batch_size]
+            error = self._post_update(batch, params)
+            if error:
+                errors.append(error)
+                if self.log:
+                    self.log.error(
+                        "Solr failed to index chunks %s to %s: %s",
+                        start,
+                        start + len(batch) - 1,
+                        error
+                    )
 
         if commit:
             self.commit()
 
-        return response.json()
+        return errors
+
+    def _post_update(self, payload, params=None):
+        """Sends an update request, returning an error message if it failed."""
+        try:
+            response = self.session.post(
+                f"{self.solr_url}/update",
+                json=payload,
+                params=params,
+                timeout=self.UPDATE_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            return str(e)
+        if response.status_code != 200:
+            try:
+                return response.json().get('error', {}).get('msg', response.text)
+            except ValueError:
+                return f"HTTP {response.status_code}: {response.text}"
+        return None
 
     def commit(self):
         """Explicitly commits pending changes in Solr."""
-        response = requests.get(f"{self.solr_url}/update?commit=true")
+        response = self.session.get(
+            f"{self.solr_url}/update",
+            params={'commit': 'true'},
+            timeout=self.UPDATE_TIMEOUT
+        )
+        return response.json()
+
+    def optimize(self):
+        """Merges the index segments in Solr."""
+        response = self.session.get(
+            f"{self.solr_url}/update",
+            params={'optimize': 'true'},
+            timeout=self.OPTIMIZE_TIMEOUT
+        )
         return response.json()
 
     def delete_document(self, document_id, commit=True):
         """Deletes a document from Solr by document_id with optional commit."""
         delete_query = {"delete": {"query": f"document_id:{document_id}"}}
-        response = requests.post(f"{self.solr_url}/update", json=delete_query)
+        response = self.session.post(
+            f"{self.solr_url}/update",
+            json=delete_query,
+            timeout=self.UPDATE_TIMEOUT
+        )
 
         if commit:
             self.commit()
 
         return response.json()
 
+    def delete_documents(self, document_ids, commit=True):
+        """Deletes many documents from Solr by document_id, committing once.
+
+        Returns a list of the errors reported by failed batches.
+        """
+        errors = []
+        for start in range(0, len(document_ids), self.DELETE_BATCH_SIZE):
+            batch = document_ids[start:start + self.DELETE_BATCH_SIZE]
+            delete_query = {"delete": {"query": f"document_id:({' OR '.join(batch)})"}}
+            error = self._post_update(delete_query)
+            if error:
+                errors.append(error)
+                if self.log:
+                    self.log.error("Solr failed to delete documents: %s", error)
+
+        if commit:
+            self.commit()
+
+        return errors
+
 class SolrClient:
-    def __init__(self, solr_url="http://localhost:8983/solr/my_core"):
+    def __init__(self, solr_url="http://localhost:8983/solr/my_core", session=None, timeout=None):
         self.solr_url = solr_url
+        self.session = session or requests.Session()
+        self.timeout = timeout
 
     def test_connection(self):
         """Tests the Solr connection by checking if the core is accessible."""
         try:
-            response = requests.get(f"{self.solr_url}/admin/ping", timeout=5)
+            response = self.session.get(f"{self.solr_url}/admin/ping", timeout=5)
             if response.status_code == 200:
                 return True
             else:
@@ -118,7 +262,7 @@ class SolrClient:
             "rows": top_n
         }
 
-        response = requests.get(f"{self.solr_url}/select", params=solr_query)
+        response = self.session.get(f"{self.solr_url}/select", params=solr_query, timeout=self.timeout)
         results = response.json().get("response", {}).get("docs", [])
 
         if not results:
@@ -141,5 +285,5 @@ class SolrClient:
     def flush_index(self):
         """Deletes all indexed documents from Solr."""
         delete_query = {"delete": {"query": "*:*"}}  # Delete everything
-        response = requests.post(f"{self.solr_url}/update?commit=true", json=delete_query)
+        response = self.session.post(f"{self.solr_url}/update?commit=true", json=delete_query)
         return response.json()
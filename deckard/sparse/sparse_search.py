@@ -1,7 +1,7 @@
 
 class SparseSearch:
     """Provides a base class for sparse search databases."""
-    def __init__(self, uri, log):
+    def __init__(self, uri, log, create_if_not_exists=False, config=None):
         pass
 
     def flush_data(self):
@@ -12,3 +12,15 @@ class SparseSearch:
 
     def index_document(self, document):
         """Adds document to the sparse search endpoint."""
+
+    def index_documents(self, documents):
+        """Adds many documents to the sparse search endpoint at once, returning a list of any errors."""
+
+    def delete_documents(self, doc_ids):
+        """Deletes the given documents from the sparse search endpoint."""
+
+    def commit(self):
+        """Makes pending changes to the sparse search endpoint visible to searches."""
+
+    def optimize(self):
+        """Merges the sparse search endpoint's index segments."""